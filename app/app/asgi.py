@@ -0,0 +1,18 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler, so the WSGI application is run in a thread
+pool by asgiref's adapter. Serve it with `manage.py serve --asgi`, which
+also needs uvicorn. It isn't in requirements.txt: `pip install uvicorn`.
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+application = WsgiToAsgi(get_wsgi_application())
@@ -23,9 +23,13 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = "ga-%5w_hcim0j98b#l6=(ct#edet$a=z+!*)q6g08kx8*)^qk0"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "1") == "1"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get("ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+]
 
 
 # Application definition
@@ -45,6 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentationMiddleware",
+    "core.middleware.ConcurrencyLimitMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,16 +85,109 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# DB_POOL_SIZE > 0 shares a pool of connections between the threads of a
+# process (core.db.backends.postgresql), returning them after every request.
+# Otherwise each thread keeps its connection open for DB_CONN_MAX_AGE seconds.
+# Health checks replace persistent connections the server dropped, checking
+# them when a request first uses them.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL_SIZE else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            "CHECK_AFTER": float(os.environ.get("DB_POOL_CHECK_AFTER", 30)),
+        },
     }
 }
 
+# read replicas of the default database, one per host in DB_REPLICA_HOSTS.
+# Safe requests read from them, except for clients that wrote within the last
+# STICKY_SECONDS, remembered in CACHE_ALIAS, which processes have to share.
+DATABASE_REPLICAS = {
+    "ALIASES": [],
+    "STICKY_SECONDS": int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5)),
+    "CACHE_ALIAS": "default",
+}
+
+DB_REPLICA_HOSTS = [
+    host.strip()
+    for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dict(DATABASES["default"], HOST=host, TEST={"MIRROR": "default"})
+    DATABASE_REPLICAS["ALIASES"].append(alias)
+
+DATABASE_ROUTERS = ["core.db.routers.PrimaryReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+RECIPE_CACHE_ALIAS = "default"
+RECIPE_CACHE_TIMEOUT = int(os.environ.get("RECIPE_CACHE_TIMEOUT", 300))
+
+# token -> user lookups cached by core.authentication.CachedTokenAuthentication,
+# CACHE_ALIAS optionally shares them between processes for TIMEOUT seconds.
+# Deleting a token or deactivating a user only clears the local cache of the
+# process doing it, others keep accepting the token for up to LOCAL_TIMEOUT
+TOKEN_CACHE = {
+    "MAX_SIZE": int(os.environ.get("TOKEN_CACHE_MAX_SIZE", 10000)),
+    "TIMEOUT": int(os.environ.get("TOKEN_CACHE_TIMEOUT", 60)),
+    "LOCAL_TIMEOUT": int(os.environ.get("TOKEN_CACHE_LOCAL_TIMEOUT", 5)),
+    "CACHE_ALIAS": os.environ.get("TOKEN_CACHE_ALIAS") or None,
+}
+
+# per-view request metrics recorded by core.middleware.InstrumentationMiddleware,
+# SERVER_TIMING also reports them to clients in a Server-Timing header
+INSTRUMENTATION = {
+    "SERVER_TIMING": os.environ.get("SERVER_TIMING", "1") == "1",
+}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/2.2/topics/auth/passwords/
+
+# hashes made with another hasher or cost are upgraded on the user's next login
+PASSWORD_HASHERS = [
+    "core.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_PBKDF2_ITERATIONS", 150000))
+
+AUTHENTICATION_BACKENDS = ["core.backends.CachedModelBackend"]
+
+# successful logins remembered by core.backends.CachedModelBackend, so logging
+# in again skips hashing the password. A TIMEOUT of 0 turns the cache off.
+LOGIN_CACHE = {
+    "MAX_SIZE": int(os.environ.get("LOGIN_CACHE_MAX_SIZE", 10000)),
+    "TIMEOUT": int(os.environ.get("LOGIN_CACHE_TIMEOUT", 300)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,3 +232,64 @@ MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
 
 AUTH_USER_MODEL = "core.User"
+
+# worker threads resizing uploaded recipe images, 0 resizes on commit inline
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", 2))
+
+# largest recipe image accepted by the upload-image action, in bytes
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get("RECIPE_IMAGE_MAX_UPLOAD_SIZE", 10 * 2**20)
+)
+
+# rows read per database round trip by the recipe export, which streams them
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# PostgreSQL text search configuration of the recipe search vectors
+RECIPE_SEARCH_CONFIG = "english"
+
+# render list endpoints from .values() rows instead of per-object serializers
+FAST_LIST = os.environ.get("FAST_LIST", "1") == "1"
+
+# JSON is encoded and decoded with orjson when it's installed, which isn't
+# required: without it the core renderer and parser behave like DRF's own
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "recipe.pagination.OptionalCursorPagination",
+    "PAGE_SIZE": 50,
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "DEFAULT_THROTTLE_CLASSES": (
+        "core.throttling.AnonThrottle",
+        "core.throttling.UserThrottle",
+        "core.throttling.WriteThrottle",
+        "core.throttling.ScopedThrottle",
+    ),
+    # token bucket rates like "10/min", a scope without a rate isn't throttled
+    "DEFAULT_THROTTLE_RATES": {
+        scope: os.environ.get(f"THROTTLE_{scope.upper()}_RATE") or None
+        for scope in ("anon", "user", "write", "login", "upload", "export")
+    },
+    # proxies in front of the app, to throttle clients by their own address
+    "NUM_PROXIES": int(os.environ["NUM_PROXIES"])
+    if os.environ.get("NUM_PROXIES")
+    else None,
+}
+
+# token buckets of core.throttling, kept in this process for up to MAX_KEYS
+# clients, or shared by every worker in the cache CACHE_ALIAS
+THROTTLING = {
+    "MAX_KEYS": int(os.environ.get("THROTTLE_MAX_KEYS", 100000)),
+    "CACHE_ALIAS": os.environ.get("THROTTLE_CACHE_ALIAS") or None,
+}
+
+# requests handled at once by a process before answering 503, 0 for no limit
+CONCURRENCY_LIMIT = {
+    "MAX_IN_FLIGHT": int(os.environ.get("MAX_IN_FLIGHT", 0)),
+    "RETRY_AFTER": int(os.environ.get("RETRY_AFTER", 1)),
+}
@@ -0,0 +1,46 @@
+"""
+Settings of API-only processes, e.g. DJANGO_SETTINGS_MODULE=app.settings_api.
+
+Drops the admin, sessions, messages, static files and the browsable API,
+which JSON clients never use, so workers import and set up less on start.
+"""
+
+from app.settings import *  # noqa: F401,F403
+from app.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+HTML_APPS = (
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+)
+HTML_MIDDLEWARE = (
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in HTML_APPS]
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in HTML_MIDDLEWARE]
+
+ROOT_URLCONF = "app.urls_api"
+
+TEMPLATES = [
+    dict(
+        TEMPLATES[0],
+        OPTIONS={
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+            ]
+        },
+    )
+]
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=("core.renderers.FastJSONRenderer",),
+    DEFAULT_AUTHENTICATION_CLASSES=("core.authentication.CachedTokenAuthentication",),
+)
@@ -0,0 +1,12 @@
+"""URLs of the REST API, served on their own by app.settings_api"""
+from django.conf import settings
+from django.conf.urls.static import static
+from django.urls import include, path
+
+from core.views import MetricsView
+
+urlpatterns = [
+    path("api/user/", include("user.urls")),
+    path("api/recipe/", include("recipe.urls")),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
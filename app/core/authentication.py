@@ -0,0 +1,195 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.db import routers
+
+# v2 entries hold no secrets, older pickled (user, token) pairs are ignored
+SHARED_KEY = "auth:token:v2:{digest}"
+# never written to the shared cache, loaded from the database if ever needed
+SECRET_USER_FIELDS = ("password",)
+
+
+class TokenCache:
+    """Bounded, thread safe LRU of key -> (user, value) with a TTL
+
+    Keys are token keys for token authentication and hashed credentials
+    for cached logins.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached (user, token) of a key or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key, value):
+        """Cache the (user, token) of a key, evicting the oldest entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Drop a single token key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        """Drop every key belonging to a user"""
+        with self._lock:
+            keys = [
+                key
+                for key, (expires, (user, token)) in self._entries.items()
+                if user.pk == user_id
+            ]
+
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+# other processes can't clear it, entries only live LOCAL_TIMEOUT seconds
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE["MAX_SIZE"],
+    timeout=settings.TOKEN_CACHE["LOCAL_TIMEOUT"],
+)
+
+
+def get_shared_cache():
+    """Return the shared cache backend for tokens, if one is configured"""
+    alias = settings.TOKEN_CACHE.get("CACHE_ALIAS")
+
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    """Return the shared cache key for a token without exposing the token"""
+    return SHARED_KEY.format(digest=hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_token(key):
+    """Forget a token key in the local and shared caches"""
+    token_cache.delete(key)
+    shared = get_shared_cache()
+
+    if shared is not None:
+        shared.delete(shared_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication which caches the token -> user lookup
+
+    Lookups are kept by the process for a few seconds and, when a shared
+    cache is configured, by the shared cache which invalidations clear.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        shared = get_shared_cache()
+
+        if cached is None and shared is not None:
+            entry = shared.get(shared_key(key))
+
+            if entry is not None:
+                cached = self.load_shared(key, entry)
+                token_cache.set(key, cached)
+
+        if cached is None:
+            cached = self.fetch_credentials(key)
+            token_cache.set(key, cached)
+
+            if shared is not None:
+                shared.set(
+                    shared_key(key),
+                    self.dump_shared(*cached),
+                    timeout=settings.TOKEN_CACHE["TIMEOUT"],
+                )
+
+        user, token = cached
+
+        # views may modify request.user, never hand out the cached instance
+        return copy.copy(user), token
+
+    def fetch_credentials(self, key):
+        """Look a token up, on the primary if the replica doesn't have it yet"""
+        try:
+            return super().authenticate_credentials(key)
+        except exceptions.AuthenticationFailed:
+            if not routers.reading_from_replica():
+                raise
+
+        with routers.primary():
+            return super().authenticate_credentials(key)
+
+    def dump_shared(self, user, token):
+        """Return what the shared cache keeps of a user and token
+
+        Neither the password hash nor the token key are stored, the key only
+        appears hashed in the cache key.
+        """
+        return {
+            "user": {
+                field.attname: getattr(user, field.attname)
+                for field in user._meta.concrete_fields
+                if field.attname not in SECRET_USER_FIELDS
+            },
+            "token_created": token.created,
+        }
+
+    def load_shared(self, key, entry):
+        """Rebuild the user and token of a shared cache entry"""
+        fields = entry["user"]
+        user = get_user_model().from_db(None, list(fields), list(fields.values()))
+        token = self.get_model().from_db(
+            None, ["key", "user_id", "created"], [key, user.pk, entry["token_created"]]
+        )
+        token.user = user
+
+        return user, token
@@ -0,0 +1,64 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.authentication import TokenCache
+
+login_cache = TokenCache(
+    max_size=settings.LOGIN_CACHE["MAX_SIZE"],
+    timeout=settings.LOGIN_CACHE["TIMEOUT"],
+)
+
+
+def login_key(username, password):
+    """Return the cache key of credentials, an HMAC keyed with SECRET_KEY"""
+    message = f"{username}\0{password}".encode()
+
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+class CachedModelBackend(ModelBackend):
+    """Model backend remembering recent successful logins in this process
+
+    Logging in again with the same credentials skips hashing the password,
+    by far the slowest part of a login. A hit still reads the user row and
+    only counts while the user still has the username, the stored password
+    hash is the one that was checked and the user may log in, so changes made
+    by other processes or by queryset updates are seen right away.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(get_user_model().USERNAME_FIELD)
+
+        if username is None or password is None or not login_cache.timeout:
+            return super().authenticate(request, username, password, **kwargs)
+
+        key = login_key(username, password)
+        cached = login_cache.get(key)
+
+        if cached is not None:
+            user_id, password_hash = cached[0].pk, cached[1]
+            user = get_user_model()._default_manager.filter(pk=user_id).first()
+
+            if (
+                user is not None
+                # the username may have been given to another user since
+                and getattr(user, user.USERNAME_FIELD) == username
+                and user.password == password_hash
+                and self.user_can_authenticate(user)
+            ):
+                return user
+
+            login_cache.delete(key)
+
+        user = super().authenticate(request, username, password, **kwargs)
+
+        if user is not None:
+            # the hash after a possible rehash by check_password
+            login_cache.set(key, (user, user.password))
+
+        return user
@@ -0,0 +1,367 @@
+import io
+import json
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Ingredient, Recipe
+
+PASSWORD = "benchmark-pass"
+
+# reserved domain, no real user can have an email there
+EMAIL_DOMAIN = "bench.invalid"
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark scenario
+
+    The decorated function receives the seeded `Dataset` and returns a
+    callable performing one request, plus an optional callable run
+    untimed before each request.
+    """
+
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+
+    return decorator
+
+
+class Dataset:
+    """Ids of the objects seeded for a benchmark run"""
+
+    def __init__(self, users, tokens, recipes, tags, ingredients):
+        self.users = users
+        self.tokens = tokens
+        self.recipes = recipes
+        self.tags = tags
+        self.ingredients = ingredients
+        self.random = random.Random(0)
+
+    @property
+    def user(self):
+        """Return the user all request scenarios run as"""
+        return self.users[0]
+
+    def client(self, user_id=None):
+        """Return a test client authenticated with a user's token"""
+        token = self.tokens[user_id or self.user]
+
+        return Client(HTTP_AUTHORIZATION=f"Token {token}")
+
+
+def _ids(queryset):
+    return list(queryset.order_by("id").values_list("id", flat=True))
+
+
+def seed(users=10, recipes=100, tags=20, ingredients=50, links=3):
+    """Create benchmark users, each owning the given number of objects"""
+    from recipe import search
+
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(email=f"bench{i}@{EMAIL_DOMAIN}", name=f"Bench {i}", password=password)
+            for i in range(users)
+        ]
+    )
+    user_ids = _ids(User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}"))
+    tokens = {pk: Token().generate_key() for pk in user_ids}
+    Token.objects.bulk_create(
+        [Token(user_id=pk, key=key) for pk, key in tokens.items()]
+    )
+
+    rng = random.Random(0)
+    recipe_ids = {}
+    tag_ids = {}
+    ingredient_ids = {}
+
+    for user_id in user_ids:
+        Tag.objects.bulk_create(
+            [Tag(user_id=user_id, name=f"tag {i}") for i in range(tags)]
+        )
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(user_id=user_id, name=f"ingredient {i}")
+                for i in range(ingredients)
+            ]
+        )
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    user_id=user_id,
+                    title=f"Recipe {i}",
+                    time_minutes=rng.randint(5, 120),
+                    price=rng.randint(100, 5000) / 100,
+                )
+                for i in range(recipes)
+            ]
+        )
+        tag_ids[user_id] = _ids(Tag.objects.filter(user_id=user_id))
+        ingredient_ids[user_id] = _ids(Ingredient.objects.filter(user_id=user_id))
+        recipe_ids[user_id] = _ids(Recipe.objects.filter(user_id=user_id))
+
+        for field, related in (("tags", tag_ids), ("ingredients", ingredient_ids)):
+            through = Recipe._meta.get_field(field).remote_field.through
+            column = f"{Recipe._meta.get_field(field).m2m_reverse_field_name()}_id"
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe_id, **{column: related_id})
+                    for recipe_id in recipe_ids[user_id]
+                    for related_id in rng.sample(
+                        related[user_id], min(links, len(related[user_id]))
+                    )
+                ]
+            )
+
+        # bulk inserts don't send the signals indexing saved recipes
+        search.update_search_vectors(recipe_ids[user_id])
+
+    return Dataset(user_ids, tokens, recipe_ids, tag_ids, ingredient_ids)
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of sorted values by nearest rank"""
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))
+
+    return values[index]
+
+
+def measure(request, iterations, warmup=5, setup=None):
+    """Time `request` and return latency percentiles, throughput and queries"""
+    for i in range(warmup):
+        if setup:
+            setup()
+        request()
+
+    if setup:
+        setup()
+    with CaptureQueriesContext(connection) as queries:
+        request()
+    # later requests reset the log the context slices
+    query_count = len(queries)
+
+    timings = []
+    for i in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        request()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    total = sum(timings)
+
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p90_ms": percentile(timings, 90) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "max_ms": timings[-1] * 1000,
+        "throughput_rps": iterations / total if total else None,
+        "queries": query_count,
+    }
+
+
+def run(dataset, names, iterations, warmup=5):
+    """Run the named scenarios and return the JSON serializable report"""
+    results = {}
+
+    for name in names:
+        request, setup = SCENARIOS[name](dataset)
+        results[name] = measure(request, iterations, warmup=warmup, setup=setup)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        },
+        "scenarios": results,
+    }
+
+
+def expect(response, status_code):
+    """Fail the benchmark loudly if a request didn't do what it should"""
+    if response.status_code != status_code:
+        raise AssertionError(
+            f"{response.request['PATH_INFO']} returned {response.status_code}: "
+            f"{response.content[:200]!r}"
+        )
+
+    return response
+
+
+@scenario("token_auth")
+def token_auth(dataset):
+    client = dataset.client()
+    url = reverse("user:me")
+
+    return lambda: expect(client.get(url), 200), None
+
+
+@scenario("login")
+def login(dataset):
+    """Logging in again, served by the login cache
+
+    Requests run one at a time, so throughput_rps is per core.
+    """
+    client = Client()
+    url = reverse("user:token")
+    email = get_user_model().objects.get(pk=dataset.user).email
+    body = {"email": email, "password": PASSWORD}
+
+    return lambda: expect(client.post(url, body), 200), None
+
+
+@scenario("login_uncached")
+def login_uncached(dataset):
+    """Logging in with a password hash on every request"""
+    from core.backends import login_cache
+
+    request, _ = login(dataset)
+
+    return request, login_cache.clear
+
+
+@scenario("recipe_list")
+def recipe_list(dataset):
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+
+    return lambda: expect(client.get(url), 200), None
+
+
+@scenario("recipe_list_uncached")
+def recipe_list_uncached(dataset):
+    from recipe import cache
+
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+
+    def setup():
+        cache.bump_version(dataset.user)
+
+    return lambda: expect(client.get(url), 200), setup
+
+
+@scenario("recipe_list_serializer")
+def recipe_list_serializer(dataset):
+    """The uncached list rendered by the serializers instead of the fast path"""
+    from recipe import cache
+
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+
+    def setup():
+        cache.bump_version(dataset.user)
+
+    def request():
+        with override_settings(FAST_LIST=False):
+            expect(client.get(url), 200)
+
+    return request, setup
+
+
+@scenario("recipe_detail")
+def recipe_detail(dataset):
+    client = dataset.client()
+    recipe_ids = dataset.recipes[dataset.user]
+
+    def request():
+        recipe_id = dataset.random.choice(recipe_ids)
+        url = reverse("recipe:recipe-detail", args=[recipe_id])
+        expect(client.get(url), 200)
+
+    return request, None
+
+
+@scenario("recipe_filter")
+def recipe_filter(dataset):
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+    tag_ids = dataset.tags[dataset.user]
+
+    def request():
+        tags = dataset.random.sample(tag_ids, min(2, len(tag_ids)))
+        expect(client.get(url, {"tags": ",".join(map(str, tags))}), 200)
+
+    return request, None
+
+
+@scenario("recipe_search")
+def recipe_search(dataset):
+    """Searching tag names within a time range, matching at least one recipe"""
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+    matches = list(
+        Recipe.objects.filter(user_id=dataset.user, tags__isnull=False)
+        .order_by("id", "tags__name")
+        .values_list("tags__name", "time_minutes")
+    )
+
+    def request():
+        terms, max_time = dataset.random.choice(matches)
+        response = expect(client.get(url, {"search": terms, "max_time": max_time}), 200)
+
+        if not response.json()["results"]:
+            raise AssertionError(f"No recipes found searching {terms!r}")
+
+    return request, None
+
+
+@scenario("recipe_create")
+def recipe_create(dataset):
+    client = dataset.client()
+    url = reverse("recipe:recipe-list")
+    tag_ids = dataset.tags[dataset.user]
+    ingredient_ids = dataset.ingredients[dataset.user]
+
+    def request():
+        payload = {
+            "title": "Benchmark recipe",
+            "time_minutes": 30,
+            "price": "9.99",
+            "tags": dataset.random.sample(tag_ids, min(3, len(tag_ids))),
+            "ingredients": dataset.random.sample(
+                ingredient_ids, min(3, len(ingredient_ids))
+            ),
+        }
+        body = json.dumps(payload)
+        expect(client.post(url, body, content_type="application/json"), 201)
+
+    return request, None
+
+
+@scenario("image_upload")
+def image_upload(dataset):
+    from PIL import Image
+
+    client = dataset.client()
+    recipe_ids = dataset.recipes[dataset.user]
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 768), (200, 100, 50)).save(buffer, format="JPEG")
+    content = buffer.getvalue()
+
+    def request():
+        recipe_id = dataset.random.choice(recipe_ids)
+        url = reverse("recipe:recipe-upload-image", args=[recipe_id])
+        image = io.BytesIO(content)
+        image.name = "benchmark.jpg"
+        expect(client.post(url, {"image": image}), 200)
+
+    return request, None
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# backends whose entries only live in the process writing them
+LOCAL_CACHE_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def is_local_cache(alias):
+    return settings.CACHES[alias]["BACKEND"] in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """Refuse process-local caches for state every worker must see
+
+    The versions of cached recipe responses and the clients sticking to
+    the primary database are only seen by the process that wrote them.
+    """
+    errors = []
+
+    if is_local_cache(settings.RECIPE_CACHE_ALIAS):
+        errors.append(
+            Error(
+                "Recipe responses are cached in a process-local cache, other "
+                "workers keep serving them after writes.",
+                hint="Set CACHE_BACKEND to a shared cache, e.g. memcached.",
+                id="core.E001",
+            )
+        )
+
+    if settings.DATABASE_REPLICAS["ALIASES"] and is_local_cache(
+        settings.DATABASE_REPLICAS["CACHE_ALIAS"]
+    ):
+        errors.append(
+            Error(
+                "Clients that wrote are sent to the primary database through a "
+                "process-local cache, other workers read from the replicas.",
+                hint="Set CACHE_BACKEND to a shared cache, e.g. memcached.",
+                id="core.E002",
+            )
+        )
+
+    return errors
@@ -0,0 +1,13 @@
+from django.db.backends.postgresql import base
+
+from core.db.backends.postgresql.creation import DatabaseCreation
+from core.db.health import HealthCheckedDatabaseWrapperMixin
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(
+    HealthCheckedDatabaseWrapperMixin, PooledDatabaseWrapperMixin, base.DatabaseWrapper
+):
+    """PostgreSQL backend checking persistent connections or pooling them"""
+
+    creation_class = DatabaseCreation
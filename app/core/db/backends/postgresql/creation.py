@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import creation
+
+from core.db.pool import PooledDatabaseCreationMixin
+
+
+class DatabaseCreation(PooledDatabaseCreationMixin, creation.DatabaseCreation):
+    """PostgreSQL test database creation closing the pooled connections"""
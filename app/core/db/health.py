@@ -0,0 +1,82 @@
+import threading
+from collections import Counter
+
+from django.db import connections
+
+from core.db.pool import pool_key, pools
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def count(alias, name):
+    with _lock:
+        _counters[alias, name] += 1
+
+
+def check_connections():
+    """Have persistent connections checked when a request first uses them
+
+    Nothing is sent to the databases here, connections a request doesn't
+    use, e.g. those of the replicas, aren't checked at all.
+    """
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.health_check_pending = True
+
+
+class HealthCheckedDatabaseWrapperMixin:
+    """Check a persistent connection the first time a request uses it
+
+    Only done for databases with CONN_HEALTH_CHECKS, so a connection the
+    server dropped while idle is reopened instead of failing the request.
+    Requests mark the connections to check with check_connections().
+    """
+
+    health_check_pending = False
+
+    def ensure_connection(self):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            self.check_health()
+
+        super().ensure_connection()
+
+    def check_health(self):
+        """Close the connection if it stopped working"""
+        if self.connection is None or self.in_atomic_block:
+            return
+
+        count(self.alias, "reused")
+
+        if self.settings_dict.get("CONN_HEALTH_CHECKS") and not self.is_usable():
+            count(self.alias, "failed_checks")
+            self.close()
+
+
+def stats():
+    """Return the persistent connection and pool counters of each database"""
+    with _lock:
+        counters = _counters.copy()
+
+    databases = {}
+
+    for alias in connections:
+        settings_dict = connections.databases[alias]
+        pool = pools.get(pool_key(alias, settings_dict))
+        databases[alias] = {
+            "conn_max_age": settings_dict.get("CONN_MAX_AGE"),
+            "health_checks": bool(settings_dict.get("CONN_HEALTH_CHECKS")),
+            "opened": counters[alias, "opened"],
+            "reused": counters[alias, "reused"],
+            "failed_checks": counters[alias, "failed_checks"],
+            "pool": pool.stats() if pool is not None else None,
+        }
+
+    return databases
+
+
+def reset():
+    """Forget the connection counters"""
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,313 @@
+import functools
+import threading
+import time
+
+from django.db import connections
+
+from core.instrumentation import MS_BUCKETS, Histogram
+
+
+class PoolTimeout(Exception):
+    """No connection of the pool was released in time"""
+
+
+class ConnectionPool:
+    """Thread safe pool of open database connections
+
+    Connections are opened on demand up to `max_size`, after which
+    acquire() waits up to `timeout` seconds for one to be released.
+    Connections idle for more than `check_after` seconds are checked
+    before being reused, and released connections that can't be reset
+    are closed rather than pooled.
+    """
+
+    def __init__(self, check, reset, close, max_size=10, timeout=5, check_after=30):
+        self.check = check
+        self.reset = reset
+        self.close = close
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+
+        # (connection, release time), the most recently released last
+        self._idle = []
+        self._size = 0
+        self._lock = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.failed_checks = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_ms = Histogram(MS_BUCKETS)
+
+    def acquire(self, create):
+        """Return an idle connection, or a new one opened with create()"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._lock:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection was released within "
+                        f"{self.timeout}s, all {self.max_size} are in use"
+                    )
+
+                waited = True
+                self._lock.wait(remaining)
+
+            if waited:
+                self.waits += 1
+                self.wait_ms.observe((time.monotonic() - start) * 1000)
+
+            if self._idle:
+                connection, released = self._idle.pop()
+            else:
+                connection = None
+                self._size += 1
+
+        if connection is not None:
+            if time.monotonic() - released < self.check_after or self.usable(
+                connection
+            ):
+                with self._lock:
+                    self.reused += 1
+
+                return connection
+
+        try:
+            connection = create()
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self.created += 1
+
+        return connection
+
+    def usable(self, connection):
+        """Check an idle connection, closing it if it doesn't work anymore"""
+        try:
+            self.check(connection)
+            return True
+        except Exception:
+            self.discard(connection, counted=False)
+
+            with self._lock:
+                self.failed_checks += 1
+
+            return False
+
+    def release(self, connection, discard=False):
+        """Give a connection back, closing it if `discard` or it can't be reset"""
+        if not discard:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+
+        if discard:
+            self.discard(connection)
+            return
+
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, connection, counted=True):
+        """Close a connection taken from the pool
+
+        Connections discarded by acquire() keep their slot (`counted` is
+        False) as a new connection replaces them.
+        """
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+        with self._lock:
+            self.closed += 1
+
+            if counted:
+                self._size -= 1
+                self._lock.notify()
+
+    def close_all(self):
+        """Close the idle connections, e.g. after forking or in tests"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def stats(self):
+        """Return the size and usage counters of the pool"""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "closed": self.closed,
+                "failed_checks": self.failed_checks,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_ms": self.wait_ms.snapshot(),
+            }
+
+
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(alias, settings_dict):
+    """Return the key of the pool for the database a settings dict points to
+
+    Connections to a database aren't handed out once the alias points to
+    another one, e.g. to the test database.
+    """
+    return (alias,) + tuple(
+        settings_dict.get(name) for name in ("NAME", "HOST", "PORT", "USER")
+    )
+
+
+def get_pool(alias, settings_dict):
+    """Return the pool of a database, created from its POOL settings"""
+    key = pool_key(alias, settings_dict)
+    pool = pools.get(key)
+
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        if key not in pools:
+            options = settings_dict.get("POOL") or {}
+            pools[key] = ConnectionPool(
+                check=check_connection,
+                reset=reset_connection,
+                close=close_connection,
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 5),
+                check_after=options.get("CHECK_AFTER", 30),
+            )
+
+        return pools[key]
+
+
+def close_pools(alias):
+    """Close the idle connections of the pools of a database alias"""
+    for key, pool in list(pools.items()):
+        if key[0] == alias:
+            pool.close_all()
+
+
+def close_all_connections():
+    """Close the database connections of this process, pooled ones included
+
+    Called before forking, child processes would share their sockets.
+    """
+    connections.close_all()
+
+    # connections closed above are given back to the pools
+    for pool in list(pools.values()):
+        pool.close_all()
+
+
+def check_connection(connection):
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("SELECT 1")
+    finally:
+        cursor.close()
+
+
+def reset_connection(connection):
+    # ends whatever transaction the last user left open
+    connection.rollback()
+
+
+def close_connection(connection):
+    connection.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """Borrow database connections from a per-process pool
+
+    Closing the connection, e.g. at the end of a request with
+    CONN_MAX_AGE = 0, gives it back to the pool instead, so threads
+    share a bounded number of connections. Mixed into the DatabaseWrapper
+    of a backend, with the pool configured in the POOL settings, no pool
+    is used unless it has a MAX_SIZE.
+    """
+
+    # whether the last connection came from the pool instead of a connect
+    connection_reused = False
+    # the pool the connection was taken from, which it is given back to
+    connection_pool = None
+
+    @property
+    def pooled(self):
+        return bool((self.settings_dict.get("POOL") or {}).get("MAX_SIZE"))
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        if not self.pooled:
+            return super().get_new_connection(conn_params)
+
+        connect = functools.partial(super().get_new_connection, conn_params)
+        self.connection_reused = True
+
+        def create():
+            self.connection_reused = False
+            return connect()
+
+        self.connection_pool = self.pool
+
+        try:
+            return self.connection_pool.acquire(create)
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if not self.pooled:
+            return super()._close()
+
+        # a connection closed inside a transaction stays referenced by this
+        # wrapper until it is rolled back, so it can't be shared
+        with self.wrap_database_errors:
+            self.connection_pool.release(self.connection, discard=self.in_atomic_block)
+
+
+class PooledDatabaseCreationMixin:
+    """Close the pooled connections around creating and destroying test databases
+
+    Idle connections would otherwise keep the test database in use when it
+    is dropped, and the database used before it open for the whole run.
+    """
+
+    def create_test_db(self, *args, **kwargs):
+        name = super().create_test_db(*args, **kwargs)
+        close_pools(self.connection.alias)
+
+        return name
+
+    def destroy_test_db(self, *args, **kwargs):
+        self.connection.close()
+        close_pools(self.connection.alias)
+
+        super().destroy_test_db(*args, **kwargs)
@@ -0,0 +1,137 @@
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_KEY = "db:primary:{digest}"
+
+_local = threading.local()
+
+
+class RoutingState:
+    """Where the reads of the request handled by this thread go"""
+
+    def __init__(self, replica):
+        aliases = replica_aliases()
+
+        self.replica = replica
+        self.wrote = False
+        # one replica per request, so its reads don't see different lags
+        self.alias = random.choice(aliases) if replica and aliases else None
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS["ALIASES"]
+
+
+def current():
+    """Return the routing state of this thread's request, if any"""
+    return getattr(_local, "state", None)
+
+
+@contextmanager
+def routing(replica):
+    """Route the reads of the block to a replica if `replica` is true
+
+    Any write in the block sends its later reads to the primary.
+    """
+    previous = current()
+    _local.state = RoutingState(replica)
+
+    try:
+        yield _local.state
+    finally:
+        _local.state = previous
+
+
+@contextmanager
+def primary():
+    """Read from the primary within the block"""
+    state = current()
+
+    if state is None or not state.replica:
+        yield
+        return
+
+    state.replica = False
+
+    try:
+        yield
+    finally:
+        state.replica = not state.wrote
+
+
+def reading_from_replica():
+    state = current()
+
+    return state is not None and state.replica
+
+
+def client_key(request):
+    """Return the sticky cache key of the client making a request
+
+    Clients are told apart by their Authorization header, session cookie
+    or, failing both, their address.
+    """
+    client = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR", "")
+    )
+
+    return STICKY_KEY.format(digest=hashlib.sha256(client.encode()).hexdigest())
+
+
+def sticky_cache():
+    return caches[settings.DATABASE_REPLICAS["CACHE_ALIAS"]]
+
+
+def is_sticky(key):
+    """Return whether a client wrote within the sticky window"""
+    return sticky_cache().get(key) is not None
+
+
+def stick(key):
+    """Send the reads of a client to the primary for the sticky window"""
+    sticky_cache().set(key, 1, timeout=settings.DATABASE_REPLICAS["STICKY_SECONDS"])
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and reads to replicas when requests allow
+
+    Reads only go to a replica inside routing(replica=True), which
+    ReplicaRoutingMiddleware uses for safe requests of clients that
+    haven't written recently.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current()
+
+        if state is not None and state.replica and state.alias:
+            return state.alias
+
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current()
+
+        # the request reads its own writes from here on
+        if state is not None:
+            state.replica = False
+            state.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are migrated through replication
+        if db in replica_aliases():
+            return False
+
+        return None
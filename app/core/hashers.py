@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher with the iterations of PASSWORD_PBKDF2_ITERATIONS
+
+    Hashes stay compatible with Django's hasher. When the setting changes,
+    passwords are rehashed with the new cost on the user's next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
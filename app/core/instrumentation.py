@@ -0,0 +1,178 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds of the histogram buckets, the last bucket is unbounded
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = tuple(2**exp for exp in range(8, 25, 2))
+
+_local = threading.local()
+
+
+class Histogram:
+    """Fixed bucket histogram, cheap enough to update on every request"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        """Count one value"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """Return the upper bound of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return None
+
+        rank = pct / 100 * self.count
+        seen = 0
+
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def snapshot(self):
+        """Return the histogram as a JSON serializable dict"""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": [
+                [bound, count]
+                for bound, count in zip(self.bounds + (None,), self.counts)
+            ],
+        }
+
+
+class ViewMetrics:
+    """Histograms of every number recorded for one view"""
+
+    def __init__(self):
+        self.wall_ms = Histogram(MS_BUCKETS)
+        self.db_ms = Histogram(MS_BUCKETS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.serializer_ms = Histogram(MS_BUCKETS)
+        self.response_bytes = Histogram(BYTES_BUCKETS)
+
+    def snapshot(self):
+        return {name: histogram.snapshot() for name, histogram in vars(self).items()}
+
+
+class MetricsRegistry:
+    """Thread safe, in-process collection of per-view metrics"""
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, metrics, wall_time, response_bytes):
+        """Add the numbers of one finished request to its view's histograms"""
+        with self._lock:
+            entry = self._views.get(view)
+
+            if entry is None:
+                entry = self._views[view] = ViewMetrics()
+
+            entry.wall_ms.observe(wall_time * 1000)
+            entry.db_ms.observe(metrics.db_time * 1000)
+            entry.queries.observe(metrics.queries)
+            entry.serializer_ms.observe(metrics.serializer_time * 1000)
+            if response_bytes is not None:
+                entry.response_bytes.observe(response_bytes)
+
+    def snapshot(self):
+        """Return the metrics of every view"""
+        with self._lock:
+            return {view: entry.snapshot() for view, entry in self._views.items()}
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Database and serializer cost of the request being handled"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time a query, installed with connection.execute_wrapper()"""
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def start_request():
+    """Begin collecting the metrics of a request on this thread"""
+    _local.metrics = RequestMetrics()
+
+    return _local.metrics
+
+
+def finish_request():
+    """Stop collecting metrics on this thread"""
+    _local.metrics = None
+
+
+def current():
+    """Return the metrics of the request handled by this thread, if any"""
+    return getattr(_local, "metrics", None)
+
+
+@contextmanager
+def timed_serialization():
+    """Add the time spent in the block to the request's serializer time
+
+    Only the outermost block is timed, so nested serializers and the
+    items of a list aren't counted twice.
+    """
+    metrics = current()
+
+    if metrics is None or metrics.serializing:
+        yield
+        return
+
+    metrics.serializing = True
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics.serializing = False
+
+
+class TimedSerializerMixin:
+    """Add the time spent serializing objects to the request metrics"""
+
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
@@ -0,0 +1,117 @@
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from core import benchmarks
+from recipe import images
+
+
+class Rollback(Exception):
+    """Raised to throw away everything a benchmark wrote"""
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the REST API hot paths"""
+
+    help = "Seed data and report latency, throughput and query counts as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help=f"Scenarios to run, any of: {', '.join(benchmarks.SCENARIOS)}",
+        )
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument("--ingredients", type=int, default=50)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--output", help="Write the report to this file")
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Run against the configured database and roll back afterwards "
+            "instead of creating a test database",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the test database between runs",
+        )
+
+    def handle(self, *args, **options):
+        names = options["scenarios"] or list(benchmarks.SCENARIOS)
+        unknown = set(names) - set(benchmarks.SCENARIOS)
+
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        old_name = None
+
+        if not options["use_current_db"]:
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+            )
+
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                # the seeded rows are only on the primary, in the test database
+                # or in a transaction rolled back afterwards, never on replicas
+                with override_settings(
+                    DEBUG=False,
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                    MEDIA_ROOT=media_root,
+                    DATABASE_REPLICAS=dict(settings.DATABASE_REPLICAS, ALIASES=[]),
+                ):
+                    try:
+                        report = self.benchmark(names, options)
+                    finally:
+                        # uploads are resized into media_root in the background
+                        images.wait_for_derivatives()
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options["keepdb"]
+                )
+
+        output = json.dumps(report, indent=2)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, names, options):
+        """Seed the dataset and run the scenarios"""
+        scale = {
+            key: options[key] for key in ("users", "recipes", "tags", "ingredients")
+        }
+
+        if options["use_current_db"]:
+            # never leave benchmark data behind in a real database
+            try:
+                with transaction.atomic():
+                    report = self.run_scenarios(names, scale, options)
+                    raise Rollback
+            except Rollback:
+                pass
+        else:
+            report = self.run_scenarios(names, scale, options)
+
+        report["scale"] = scale
+
+        return report
+
+    def run_scenarios(self, names, scale, options):
+        dataset = benchmarks.seed(**scale)
+
+        return benchmarks.run(
+            dataset, names, options["iterations"], warmup=options["warmup"]
+        )
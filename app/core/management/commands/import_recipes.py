@@ -0,0 +1,123 @@
+import os
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from NDJSON or CSV files"""
+
+    help = (
+        "Import recipes in the format of the recipe export, creating missing "
+        "tags and ingredients, in batches that can be resumed after a failure"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for stdin")
+        parser.add_argument("--user", required=True, help="Email of the owner")
+        parser.add_argument(
+            "--format",
+            choices=sorted(importer.READERS),
+            help="Input format, by default from the file extension",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes inserting batches, such imports can't be resumed",
+        )
+        parser.add_argument(
+            "--no-copy",
+            dest="use_copy",
+            action="store_false",
+            default=None,
+            help="Insert relations with INSERTs instead of PostgreSQL's COPY",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording the rows imported, PATH.checkpoint by default",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the rows recorded in the checkpoint",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or os.path.splitext(path)[1].lstrip(".")
+
+        if input_format not in importer.READERS:
+            raise CommandError("Pass --format, it can't be told from the path")
+
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['user']}")
+
+        checkpoint = options["checkpoint"]
+
+        if checkpoint is None and path != "-":
+            checkpoint = f"{path}.checkpoint"
+        if options["resume"] and checkpoint is None:
+            raise CommandError("Resuming an import from stdin needs --checkpoint")
+        if options["resume"] and options["workers"] > 1:
+            raise CommandError(
+                "Imports with --workers commit batches out of order, "
+                "they can't be resumed"
+            )
+
+        skip = importer.load_checkpoint(checkpoint) if options["resume"] else 0
+        recipes = importer.Importer(
+            user,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            use_copy=options["use_copy"],
+        )
+
+        with self.open(path) as f:
+            try:
+                count = recipes.run(
+                    importer.READERS[input_format](f),
+                    skip=skip,
+                    checkpoint=checkpoint,
+                    progress=self.progress if options["verbosity"] > 1 else None,
+                )
+            except importer.InvalidRow as exc:
+                if options["workers"] > 1:
+                    raise CommandError(
+                        f"{exc}. Batches were committed out of order, remove "
+                        "the recipes imported before running again"
+                    )
+
+                raise CommandError(
+                    f"{exc}. {recipes.imported + skip} rows were imported, "
+                    "fix the input and run again with --resume"
+                )
+
+        elapsed = recipes.elapsed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {count} recipes in {elapsed:.1f}s "
+                f"({count / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+        )
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    def open(self, path):
+        if path == "-":
+            return open(sys.stdin.fileno(), newline="", closefd=False)
+
+        try:
+            return open(path, newline="", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+    def progress(self, imported, elapsed):
+        self.stdout.write(f"{imported} rows, {imported / elapsed:.0f} rows/s")
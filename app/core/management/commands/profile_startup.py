@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    """Django command to time the start of a worker process"""
+
+    help = (
+        "Start a fresh interpreter with -X importtime like a worker would and "
+        "report its import time, failing on eagerly imported modules or when "
+        "over budget"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-module",
+            default="app.settings_api",
+            help="Settings of the profiled process",
+        )
+        parser.add_argument(
+            "--max-import-ms",
+            type=float,
+            help="Fail when importing takes longer than this",
+        )
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        wall_ms, modules = startup.profile_startup(options["settings_module"])
+        report = {
+            "settings": options["settings_module"],
+            "wall_ms": round(wall_ms, 1),
+            "import_ms": round(startup.import_ms(modules), 1),
+            "modules": len(modules),
+            "eager_modules": startup.eager_modules(modules),
+            "slowest": [
+                [name, round(ms, 1)]
+                for name, ms in startup.slowest(modules, options["top"])
+            ],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(
+                f"{report['settings']}: {report['wall_ms']} ms to start, "
+                f"{report['import_ms']} ms importing {report['modules']} modules"
+            )
+            for name, ms in report["slowest"]:
+                self.stdout.write(f"{ms:>10.1f} ms  {name}")
+
+        if report["eager_modules"]:
+            raise CommandError(
+                f"Imported on startup: {', '.join(report['eager_modules'])}"
+            )
+
+        budget = options["max_import_ms"]
+
+        if budget is not None and report["import_ms"] > budget:
+            raise CommandError(
+                f"Importing took {report['import_ms']} ms, over the {budget} ms budget"
+            )
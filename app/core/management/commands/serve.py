@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import serving
+
+WSGI_APPLICATION = "app.wsgi:application"
+ASGI_APPLICATION = "app.asgi:application"
+ASGI_WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+# uvicorn is optional, only needed to serve the ASGI application
+INSTALL_HINTS = {
+    "gunicorn": "install the requirements with `pip install -r requirements.txt`",
+    "uvicorn": "install it with `pip install uvicorn` to serve with --asgi",
+}
+
+
+class Command(BaseCommand):
+    """Django command to run the production server"""
+
+    help = "Run gunicorn with a number of workers fitting the available CPUs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bind", help="Address to listen on, e.g. 0.0.0.0:8000")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Worker processes, twice the available CPUs plus one by default",
+        )
+        parser.add_argument("--threads", type=int, help="Threads per worker")
+        parser.add_argument(
+            "--asgi",
+            action="store_true",
+            help="Serve the ASGI application with uvicorn workers",
+        )
+
+    def handle(self, *args, **options):
+        self.require("gunicorn")
+
+        cpus = serving.available_cpus()
+        workers = options["workers"] or serving.default_workers(cpus)
+        argv = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            os.path.join(settings.BASE_DIR, "gunicorn.conf.py"),
+            "--chdir",
+            settings.BASE_DIR,
+            "--workers",
+            str(workers),
+        ]
+
+        if options["bind"]:
+            argv += ["--bind", options["bind"]]
+
+        if options["threads"]:
+            argv += ["--threads", str(options["threads"])]
+
+        if options["asgi"]:
+            self.require("uvicorn")
+            argv += ["--worker-class", ASGI_WORKER_CLASS, ASGI_APPLICATION]
+        else:
+            argv.append(WSGI_APPLICATION)
+
+        self.stdout.write(f"Starting {workers} workers on {cpus} available CPUs")
+        self.stdout.flush()
+        os.execv(sys.executable, argv)
+
+    def require(self, module):
+        if importlib.util.find_spec(module) is None:
+            raise CommandError(f"{module} isn't installed, {INSTALL_HINTS[module]}")
@@ -0,0 +1,143 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from core import instrumentation, throttling
+from core.db import routers
+
+
+class InstrumentationMiddleware:
+    """Record wall time, queries, DB time, serializer time and response size
+
+    Numbers are aggregated per view into `instrumentation.registry` and,
+    when enabled, sent back to the client in a Server-Timing header. The
+    body of streamed responses is produced afterwards and isn't measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = instrumentation.start_request()
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+
+                response = self.get_response(request)
+        finally:
+            instrumentation.finish_request()
+
+        wall_time = time.perf_counter() - start
+        match = request.resolver_match
+        view = f"{request.method} {match.view_name if match else 'unresolved'}"
+        size = None if response.streaming else len(response.content)
+        instrumentation.registry.record(view, metrics, wall_time, size)
+
+        if settings.INSTRUMENTATION["SERVER_TIMING"]:
+            response["Server-Timing"] = server_timing(metrics, wall_time)
+
+        return response
+
+
+def server_timing(metrics, wall_time):
+    """Return the Server-Timing header value of a request"""
+    return ", ".join(
+        [
+            f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+            f"serializer;dur={metrics.serializer_time * 1000:.2f}",
+            f"total;dur={wall_time * 1000:.2f}",
+        ]
+    )
+
+
+class ConcurrencyLimitMiddleware:
+    """Answer 503 when MAX_IN_FLIGHT requests are already being handled
+
+    Shedding the excess requests right away keeps the latency of the
+    admitted ones bounded under overload, instead of queueing everything.
+    Streamed responses, e.g. exports, stay in flight until they are closed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        limit = settings.CONCURRENCY_LIMIT["MAX_IN_FLIGHT"]
+
+        if not limit:
+            return self.get_response(request)
+
+        if not throttling.limiter.acquire(limit):
+            response = JsonResponse({"detail": "Server overloaded."}, status=503)
+            response["Retry-After"] = settings.CONCURRENCY_LIMIT["RETRY_AFTER"]
+
+            return response
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            throttling.limiter.release()
+            raise
+
+        if response.streaming:
+            release_on_close(response)
+        else:
+            throttling.limiter.release()
+
+        return response
+
+
+def release_on_close(response):
+    """Count a streamed response out of the in-flight requests once closed
+
+    The server closes responses after sending the last chunk, or when the
+    client went away.
+    """
+    close = response.close
+    released = False
+
+    def close_and_release():
+        nonlocal released
+
+        try:
+            close()
+        finally:
+            if not released:
+                released = True
+                throttling.limiter.release()
+
+    response.close = close_and_release
+
+
+class ReplicaRoutingMiddleware:
+    """Read from database replicas while handling safe requests
+
+    Clients that wrote something, with an unsafe method or as a side effect
+    of a safe one, read from the primary for the next STICKY_SECONDS so
+    they see their own writes despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not routers.replica_aliases():
+            return self.get_response(request)
+
+        key = routers.client_key(request)
+        safe = request.method in SAFE_METHODS
+
+        with routers.routing(replica=safe and not routers.is_sticky(key)) as state:
+            response = self.get_response(request)
+
+        if state.wrote or not safe:
+            routers.stick(key)
+
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_recipe_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "updated_at"], name="core_recipe_user_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_recipe_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                fields=["user", "-name", "id"], name="core_ingredient_user_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["user", "id"], name="core_recipe_user_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["user", "-name", "id"], name="core_tag_user_name_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="core_recipe_search_idx"
+)
+
+BACKFILL_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english', core_recipe.title), 'A')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_tag.name, ' ') FROM core_tag
+        JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_ingredient.name, ' ') FROM core_ingredient
+        JOIN core_recipe_ingredients
+            ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'C')
+"""
+
+
+def add_search_index(apps, schema_editor):
+    """GIN indexes only exist on PostgreSQL"""
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("core", "Recipe"), SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("core", "Recipe"), SEARCH_INDEX)
+
+
+def backfill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(BACKFILL_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_user_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "time_minutes"], name="core_recipe_user_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "price"], name="core_recipe_user_price_idx"
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="recipe", index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
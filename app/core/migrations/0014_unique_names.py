@@ -0,0 +1,91 @@
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from recipe import cache
+
+UNIQUE_INDEXES = {
+    "tag": "core_tag_user_lower_name_uniq",
+    "ingredient": "core_ingredient_user_lower_name_uniq",
+}
+
+
+def merge_duplicates(apps, schema_editor):
+    """Keep the oldest of the tags/ingredients a user has under one name
+
+    Recipes using the duplicates use the kept one instead, they are touched
+    and the cached responses of their users dropped, as their ids changed.
+    """
+    Recipe = apps.get_model("core", "Recipe")
+    touched = set()
+
+    for model_name, field_name in (("tag", "tags"), ("ingredient", "ingredients")):
+        model = apps.get_model("core", model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = f"{field.m2m_field_name()}_id"
+        target = f"{field.m2m_reverse_field_name()}_id"
+        named = model.objects.annotate(lower_name=Lower("name"))
+        groups = (
+            named.values("user_id", "lower_name")
+            .annotate(keep=Min("id"), count=Count("id"))
+            .filter(count__gt=1)
+        )
+
+        for group in groups.iterator():
+            duplicates = list(
+                named.filter(user_id=group["user_id"], lower_name=group["lower_name"])
+                .exclude(pk=group["keep"])
+                .values_list("pk", flat=True)
+            )
+            linked = set(
+                through.objects.filter(**{target: group["keep"]}).values_list(
+                    source, flat=True
+                )
+            )
+            moved = set(
+                through.objects.filter(**{f"{target}__in": duplicates}).values_list(
+                    source, flat=True
+                )
+            )
+            through.objects.bulk_create(
+                [
+                    through(**{source: recipe_id, target: group["keep"]})
+                    for recipe_id in moved - linked
+                ]
+            )
+            through.objects.filter(**{f"{target}__in": duplicates}).delete()
+            model.objects.filter(pk__in=duplicates).delete()
+            touched |= moved
+            cache.bump_version_on_commit(group["user_id"])
+
+    Recipe.objects.filter(pk__in=touched).update(updated_at=timezone.now())
+
+
+def check_constraints(apps, schema_editor):
+    """Check the deferred foreign keys of the deleted rows now
+
+    PostgreSQL can't index tables with pending trigger events.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_recipe_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunPython(check_constraints, migrations.RunPython.noop),
+    ] + [
+        # expression indexes can't be declared on models before Django 3.2
+        migrations.RunSQL(
+            f"CREATE UNIQUE INDEX {index} ON core_{model_name} (user_id, LOWER(name))",
+            f"DROP INDEX {index}",
+        )
+        for model_name, index in UNIQUE_INDEXES.items()
+    ]
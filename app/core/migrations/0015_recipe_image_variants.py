@@ -0,0 +1,44 @@
+import json
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# variant -> file extension, as named by recipe.images when migrating
+VARIANT_EXTENSIONS = {"thumbnail": "jpg", "medium": "jpg", "webp": "webp"}
+
+
+def record_existing_variants(apps, schema_editor):
+    """Record the variants already generated for the current images"""
+    Recipe = apps.get_model("core", "Recipe")
+
+    for recipe in Recipe.objects.exclude(image="").exclude(image=None).iterator():
+        base = os.path.splitext(recipe.image.name)[0]
+        variants = {
+            variant: f"{base}_{variant}.{ext}"
+            for variant, ext in VARIANT_EXTENSIONS.items()
+        }
+        ready = {
+            variant: name
+            for variant, name in variants.items()
+            if default_storage.exists(name)
+        }
+
+        if ready:
+            Recipe.objects.filter(pk=recipe.pk).update(image_variants=json.dumps(ready))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_unique_names"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(record_existing_variants, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,8 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from django.conf import settings
 
@@ -59,6 +61,12 @@ class Tag(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-name", "id"], name="core_tag_user_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -69,6 +77,14 @@ class Ingredient(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-name", "id"], name="core_ingredient_user_name_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -85,6 +101,25 @@ class Recipe(models.Model):
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # JSON {variant: storage name} of the resized images generated so far,
+    # maintained by recipe.images
+    image_variants = models.TextField(blank=True, default="", editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by recipe.search, only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "updated_at"], name="core_recipe_user_updated_idx"
+            ),
+            models.Index(fields=["user", "id"], name="core_recipe_user_id_idx"),
+            models.Index(
+                fields=["user", "time_minutes"], name="core_recipe_user_time_idx"
+            ),
+            models.Index(fields=["user", "price"], name="core_recipe_user_price_idx"),
+            GinIndex(fields=["search_vector"], name="core_recipe_search_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,47 @@
+import codecs
+import io
+import re
+
+from django.conf import settings
+from rest_framework import parsers
+
+from core.renderers import FastJSONRenderer, orjson
+
+# orjson reads integers wider than 64 bits as floats, so long runs of digits
+# are left to json.loads. Digits in strings or floats only cost a fallback.
+LONG_NUMBER = re.compile(rb"\d{19}")
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSON parser decoding with orjson when it's installed
+
+    Anything orjson rejects (invalid JSON, lone surrogates) is parsed again
+    by JSONParser, as are bodies with integers orjson can't represent, so
+    the data and the error messages stay the same.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        if orjson is None or not self.strict or not is_utf8(encoding):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+
+        if LONG_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+def is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return False
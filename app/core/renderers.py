@@ -0,0 +1,62 @@
+import re
+
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# floats orjson formats differently from json.dumps, e.g. 1e16 and 0.00001
+# instead of 1e+16 and 1e-05. Matches in strings only cost a fallback.
+FLOAT_EXPONENT = re.compile(rb"(?:^|[:,\[])-?(?:\d+(?:\.\d+)?e|0\.0000)")
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer encoding with orjson when it's installed
+
+    Renders byte for byte what JSONRenderer does, falling back to it for
+    pretty printed output, non default JSON settings and the values
+    orjson encodes differently (non string keys, 64+ bit integers and
+    floats written with an exponent). Datetimes still go through DRF's
+    encoder so they keep its format. One difference remains: orjson
+    writes NaN and infinity as null where JSONRenderer raises.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if not self.can_use_orjson(indent):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if FLOAT_EXPONENT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # same escaping as JSONRenderer, keeping the output a javascript subset
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+    def can_use_orjson(self, indent):
+        """Return whether orjson writes the same output as json.dumps would"""
+        return (
+            orjson is not None
+            and indent is None
+            and self.compact
+            and self.strict
+            and not self.ensure_ascii
+        )
@@ -0,0 +1,60 @@
+import math
+import os
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def read_first_line(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """Return the number of CPUs the container is limited to, None if unlimited"""
+    cpu_max = read_first_line(CGROUP_V2_CPU_MAX)
+
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota = read_first_line(CGROUP_V1_QUOTA)
+        period = read_first_line(CGROUP_V1_PERIOD)
+
+    try:
+        quota, period = int(quota), int(period)
+    except (TypeError, ValueError):
+        # "max" or no cgroup files at all
+        return None
+
+    if quota <= 0 or period <= 0:
+        return None
+
+    return quota / period
+
+
+def available_cpus():
+    """Return how many CPUs this process can use
+
+    Takes the CPU affinity and the cgroup quota of a container into
+    account, unlike os.cpu_count().
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+
+    return cpus
+
+
+def default_workers(cpus):
+    """Return the number of worker processes to run on `cpus` CPUs"""
+    return cpus * 2 + 1
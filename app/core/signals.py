@@ -0,0 +1,43 @@
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import get_shared_cache, invalidate_token, token_cache
+from core.backends import login_cache
+from core.db import health
+from core.models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a token as soon as it is deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop cached tokens and logins of a saved (e.g. deactivated) or deleted user"""
+    token_cache.delete_user(instance.pk)
+    login_cache.delete_user(instance.pk)
+
+    if get_shared_cache() is not None:
+        for key in Token.objects.filter(user_id=instance.pk).values_list(
+            "key", flat=True
+        ):
+            invalidate_token(key)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    """Replace broken persistent database connections as requests use them"""
+    health.check_connections()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    # connections handed out again by a pool were counted when opened
+    if not getattr(connection, "connection_reused", False):
+        health.count(connection.alias, "opened")
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# what a worker does before serving its first request
+STARTUP_CODE = """
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+application = get_wsgi_application()
+get_resolver().url_patterns
+"""
+
+# modules API workers shouldn't import before handling a request. The admin
+# and messages can't be listed, DRF's views import them through admindocs.
+LAZY_MODULES = (
+    "PIL",
+    "django.contrib.sessions",
+    "django.contrib.staticfiles",
+    "core.benchmarks",
+)
+
+
+def parse_importtime(output):
+    """Return (module, depth, cumulative microseconds) from -X importtime"""
+    modules = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+
+        if not cumulative.strip().isdigit():
+            # the header line
+            continue
+
+        # nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(cumulative)))
+
+    return modules
+
+
+def profile_startup(settings_module):
+    """Start a fresh interpreter like a worker and time it
+
+    Returns the wall time in milliseconds and the parsed import times.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if result.returncode:
+        raise RuntimeError(f"Starting {settings_module} failed:\n{result.stderr}")
+
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def import_ms(modules):
+    """Return the total import time, the sum of the top level imports"""
+    return sum(us for name, depth, us in modules if depth == 0) / 1000
+
+
+def slowest(modules, count):
+    """Return the `count` slowest top level imports as (module, ms)"""
+    top = sorted(
+        ((name, us / 1000) for name, depth, us in modules if depth == 0),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+    return top[:count]
+
+
+def eager_modules(modules):
+    """Return the LAZY_MODULES (or their submodules) that were imported"""
+    return sorted(
+        name
+        for name, depth, us in modules
+        if any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+    )
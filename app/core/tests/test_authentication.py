@@ -0,0 +1,184 @@
+import pickle
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    shared_key,
+    token_cache,
+)
+
+ME_URL = reverse("user:me")
+
+
+class TokenCacheTests(TestCase):
+    """Test the bounded token LRU"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the cache never grows beyond its max size"""
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @patch("core.authentication.time.monotonic")
+    def test_entries_expire(self, monotonic):
+        """Test that entries are dropped once their TTL passes"""
+        cache = TokenCache(max_size=2, timeout=60)
+        monotonic.return_value = 100
+        cache.set("a", 1)
+
+        monotonic.return_value = 161
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com", "testpass", name="name"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_second_request_skips_token_query(self):
+        """Test the token lookup is only done once"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+        self.assertEqual(token_cache.stats()["hits"], 1)
+        self.assertEqual(token_cache.stats()["misses"], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating immediately"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating immediately"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch("core.authentication.time.monotonic")
+    def test_invalidated_elsewhere_expires(self, monotonic):
+        """Test tokens deleted by another process expire from the local cache"""
+        monotonic.return_value = 100
+        self.client.get(ME_URL)
+
+        # the signal clearing the cache is received by the other process
+        with patch("core.signals.invalidate_token"):
+            self.token.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        monotonic.return_value = 100 + token_cache.timeout + 1
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertLessEqual(token_cache.timeout, 5)
+
+    def test_update_keeps_changes_of_other_processes(self):
+        """Test updates don't write back a cached copy of the user"""
+        self.client.get(ME_URL)
+        # e.g. a password changed by another process, without clearing this cache
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password("newpass")
+        )
+
+        res = self.client.patch(ME_URL, {"name": "new name"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("newpass"))
+        self.assertEqual(self.user.name, "new name")
+
+    def test_profile_update_visible(self):
+        """Test the cached user is refreshed after the user is saved"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {"name": "new name"})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "new name")
+
+    @override_settings(
+        TOKEN_CACHE={
+            "MAX_SIZE": 10,
+            "TIMEOUT": 60,
+            "LOCAL_TIMEOUT": 5,
+            "CACHE_ALIAS": "default",
+        }
+    )
+    def test_shared_cache(self):
+        """Test tokens are shared between processes through the cache"""
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        TOKEN_CACHE={
+            "MAX_SIZE": 10,
+            "TIMEOUT": 60,
+            "LOCAL_TIMEOUT": 5,
+            "CACHE_ALIAS": "default",
+        }
+    )
+    def test_shared_cache_keeps_no_secrets(self):
+        """Test the password hash and token key aren't written to the shared cache"""
+        self.client.get(ME_URL)
+        stored = pickle.dumps(caches["default"].get(shared_key(self.token.key)))
+
+        self.assertNotIn(self.user.password.encode(), stored)
+        self.assertNotIn(self.token.key.encode(), stored)
+
+        token_cache.clear()
+        user, token = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+
+        self.assertEqual((user.pk, user.email), (self.user.pk, self.user.email))
+        self.assertEqual((token.key, token.user_id), (self.token.key, self.user.pk))
+        # loaded from the database when needed
+        self.assertTrue(user.check_password("testpass"))
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.backends import login_cache
+
+TOKEN_URL = reverse("user:token")
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginTests(TestCase):
+    """Test the password hashing policy and the cached login path"""
+
+    def setUp(self):
+        login_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+        self.client = APIClient()
+
+    def login(self, password="testpass"):
+        return self.client.post(
+            TOKEN_URL, {"email": "test@londonappdev.com", "password": password}
+        )
+
+    def test_iterations_from_settings(self):
+        """Test passwords are hashed with the configured cost"""
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_rehash_on_login(self):
+        """Test passwords are rehashed when the cost changes"""
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+        self.assertTrue(self.user.check_password("testpass"))
+
+    def test_repeated_login_skips_hashing(self):
+        """Test logging in again doesn't hash the password"""
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        with mock.patch("django.contrib.auth.hashers.check_password") as check:
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        check.assert_not_called()
+
+    def test_repeated_login_reuses_token(self):
+        """Test logins return the user's existing token"""
+        first, second = self.login(), self.login()
+
+        self.assertEqual(first.data["token"], second.data["token"])
+        self.assertEqual(Token.objects.filter(user=self.user).count(), 1)
+
+    def test_wrong_password(self):
+        """Test wrong passwords are rejected, also after a valid login"""
+        self.login()
+
+        res = self.login("wrong")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_password_change(self):
+        """Test the old password stops working once it is changed"""
+        self.login()
+        self.user.set_password("newpass")
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login("newpass").status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user(self):
+        """Test deactivated users can't log in with cached credentials"""
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changes_without_signals(self):
+        """Test cached logins see updates made without saving the user"""
+        self.login()
+        users = get_user_model().objects.filter(pk=self.user.pk)
+        users.update(is_active=False)
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+        users.update(is_active=True, password=make_password("newpass"))
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login("newpass").status_code, status.HTTP_200_OK)
+
+    def test_email_change_without_signals(self):
+        """Test the old email stops logging in once changed by an update"""
+        self.login()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            email="new@londonappdev.com"
+        )
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(
+            TOKEN_URL, {"email": "new@londonappdev.com", "password": "testpass"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
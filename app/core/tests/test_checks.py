@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from core import checks
+
+LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+SHARED = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": "cache:11211",
+    }
+}
+REPLICAS = {"ALIASES": ["replica_0"], "STICKY_SECONDS": 5, "CACHE_ALIAS": "default"}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Test the deploy check of the caches every worker must share"""
+
+    def error_ids(self):
+        return [error.id for error in checks.check_shared_caches(None)]
+
+    @override_settings(CACHES=LOCAL, DATABASE_REPLICAS=REPLICAS)
+    def test_local_cache_refused(self):
+        self.assertEqual(self.error_ids(), ["core.E001", "core.E002"])
+
+    @override_settings(CACHES=SHARED, DATABASE_REPLICAS=REPLICAS)
+    def test_shared_cache(self):
+        self.assertEqual(self.error_ids(), [])
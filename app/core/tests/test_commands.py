@@ -1,8 +1,14 @@
+import json
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core import benchmarks
 
 
 class CommandTests(TestCase):
@@ -20,3 +26,102 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command("wait_for_db")
             self.assertEqual(gi.call_count, 6)
+
+    def test_benchmark(self):
+        """Test the benchmark reports every scenario as JSON"""
+        out = StringIO()
+        call_command(
+            "benchmark",
+            "--use-current-db",
+            "--users=2",
+            "--recipes=5",
+            "--tags=3",
+            "--ingredients=3",
+            "--iterations=3",
+            "--warmup=1",
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report["scenarios"]), set(benchmarks.SCENARIOS))
+        self.assertEqual(report["scale"]["recipes"], 5)
+        for result in report["scenarios"].values():
+            self.assertEqual(result["iterations"], 3)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertGreater(report["scenarios"]["recipe_create"]["queries"], 0)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_seed_own_users(self):
+        """Test the seeded users never include existing ones"""
+        existing = get_user_model().objects.create_user("bench@gmail.com", "pass")
+
+        dataset = benchmarks.seed(users=2, recipes=1, tags=1, ingredients=1)
+
+        self.assertEqual(len(dataset.users), 2)
+        self.assertNotIn(existing.pk, dataset.users)
+
+    @override_settings(
+        DATABASE_REPLICAS={
+            "ALIASES": ["replica_0"],
+            "STICKY_SECONDS": 5,
+            "CACHE_ALIAS": "default",
+        }
+    )
+    def test_benchmark_ignores_replicas(self):
+        """Test the benchmark reads the seeded primary, not the replicas"""
+        out = StringIO()
+        call_command(
+            "benchmark",
+            "recipe_list_uncached",
+            "--use-current-db",
+            "--users=1",
+            "--recipes=2",
+            "--iterations=1",
+            "--warmup=0",
+            stdout=out,
+        )
+
+        self.assertIn("recipe_list_uncached", json.loads(out.getvalue())["scenarios"])
+
+    def test_benchmark_unknown_scenario(self):
+        """Test unknown scenarios are rejected"""
+        with self.assertRaises(CommandError):
+            call_command("benchmark", "nope", "--use-current-db")
+
+    @patch("core.serving.available_cpus", return_value=2)
+    @patch("importlib.util.find_spec")
+    @patch("os.execv")
+    def test_serve(self, execv, find_spec, cpus):
+        """Test serve runs gunicorn with workers for the available CPUs"""
+        call_command("serve", "--threads=8", stdout=StringIO())
+
+        argv = execv.call_args[0][1]
+        self.assertEqual(argv[1:3], ["-m", "gunicorn"])
+        self.assertEqual(argv[argv.index("--workers") + 1], "5")
+        self.assertEqual(argv[argv.index("--threads") + 1], "8")
+        self.assertEqual(argv[-1], "app.wsgi:application")
+
+    @patch("importlib.util.find_spec")
+    @patch("os.execv")
+    def test_serve_asgi(self, execv, find_spec):
+        """Test serve runs the ASGI application with uvicorn workers"""
+        call_command("serve", "--asgi", "--workers=3", stdout=StringIO())
+
+        argv = execv.call_args[0][1]
+        self.assertEqual(argv[argv.index("--workers") + 1], "3")
+        self.assertIn("uvicorn.workers.UvicornWorker", argv)
+        self.assertEqual(argv[-1], "app.asgi:application")
+
+    @patch("importlib.util.find_spec", return_value=None)
+    def test_serve_without_gunicorn(self, find_spec):
+        """Test serve fails when gunicorn isn't installed"""
+        with self.assertRaises(CommandError):
+            call_command("serve", stdout=StringIO())
+
+    @patch("importlib.util.find_spec")
+    def test_serve_asgi_without_uvicorn(self, find_spec):
+        """Test serve --asgi explains how to install uvicorn when it is missing"""
+        find_spec.side_effect = lambda name: None if name == "uvicorn" else object()
+
+        with self.assertRaisesMessage(CommandError, "pip install uvicorn"):
+            call_command("serve", "--asgi", stdout=StringIO())
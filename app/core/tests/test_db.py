@@ -0,0 +1,304 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.db.backends.sqlite3 import creation as sqlite_creation
+from django.db.utils import ConnectionHandler
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db import health
+from core.db.health import HealthCheckedDatabaseWrapperMixin
+from core.db.pool import (
+    ConnectionPool,
+    PooledDatabaseCreationMixin,
+    PooledDatabaseWrapperMixin,
+    PoolTimeout,
+    check_connection,
+    close_all_connections,
+    close_pools,
+    close_connection,
+    pools,
+    reset_connection,
+)
+
+
+class PooledSQLiteWrapper(PooledDatabaseWrapperMixin, sqlite_base.DatabaseWrapper):
+    """SQLite stand-in for the pooled PostgreSQL backend"""
+
+
+class PooledSQLiteCreation(
+    PooledDatabaseCreationMixin, sqlite_creation.DatabaseCreation
+):
+    """SQLite stand-in for the PostgreSQL test database creation"""
+
+
+class HealthCheckedSQLiteWrapper(
+    HealthCheckedDatabaseWrapperMixin, sqlite_base.DatabaseWrapper
+):
+    """SQLite stand-in for the health checked PostgreSQL backend"""
+
+
+def sample_pool(**kwargs):
+    return ConnectionPool(
+        check=check_connection,
+        reset=reset_connection,
+        close=close_connection,
+        **kwargs,
+    )
+
+
+def database_settings(**settings):
+    """Return complete settings of a database, like in DATABASES"""
+    handler = ConnectionHandler({"default": settings})
+    handler.ensure_defaults("default")
+
+    return handler.databases["default"]
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the connection pool"""
+
+    def test_connections_reused(self):
+        """Test released connections are handed out again"""
+        pool = sample_pool()
+        first = pool.acquire(connect)
+        pool.release(first)
+
+        self.assertIs(pool.acquire(connect), first)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["reused"]), (1, 1))
+        self.assertEqual((stats["size"], stats["in_use"]), (1, 1))
+
+    def test_pool_exhausted(self):
+        """Test acquiring times out when every connection is in use"""
+        pool = sample_pool(max_size=1, timeout=0.01)
+        pool.acquire(connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(connect)
+
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waits_for_release(self):
+        """Test acquiring waits for a connection to be released"""
+        pool = sample_pool(max_size=1, timeout=5)
+        connection = pool.acquire(connect)
+        timer = threading.Timer(0.02, pool.release, [connection])
+        timer.start()
+
+        self.assertIs(pool.acquire(connect), connection)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["wait_ms"]["count"], 1)
+
+    def test_broken_connection_not_pooled(self):
+        """Test connections that can't be reset are closed on release"""
+        pool = sample_pool()
+        connection = pool.acquire(connect)
+        connection.close()
+        pool.release(connection)
+
+        self.assertIsNot(pool.acquire(connect), connection)
+        stats = pool.stats()
+        self.assertEqual((stats["closed"], stats["created"], stats["size"]), (1, 2, 1))
+
+    def test_idle_connections_checked(self):
+        """Test idle connections failing their health check are replaced"""
+        pool = sample_pool(check_after=0)
+        connection = pool.acquire(connect)
+        pool.release(connection)
+
+        with mock.patch.object(pool, "check", side_effect=sqlite3.Error):
+            self.assertIsNot(pool.acquire(connect), connection)
+
+        stats = pool.stats()
+        self.assertEqual((stats["failed_checks"], stats["size"]), (1, 1))
+
+
+class PooledBackendTests(TestCase):
+    """Test database wrappers borrowing connections from the pool"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.settings = database_settings(
+            NAME=self.path, POOL={"MAX_SIZE": 1, "TIMEOUT": 0}
+        )
+
+    def tearDown(self):
+        close_pools("pooled")
+        os.remove(self.path)
+
+    def wrapper(self):
+        return PooledSQLiteWrapper(self.settings, "pooled")
+
+    def test_connection_shared(self):
+        """Test a closed connection is reused by the next wrapper"""
+        first, second = self.wrapper(), self.wrapper()
+        first.ensure_connection()
+        connection = first.connection
+        first.close()
+
+        with second.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+        self.assertIs(second.connection, connection)
+        self.assertEqual(self.wrapper().pool.stats()["reused"], 1)
+        second.close()
+
+    def test_reused_not_counted_opened(self):
+        """Test connections handed out again by the pool aren't counted opened"""
+        health.reset()
+
+        for wrapper in (self.wrapper(), self.wrapper()):
+            wrapper.ensure_connection()
+            wrapper.close()
+
+        self.assertEqual(health._counters["pooled", "opened"], 1)
+
+    def test_without_pool(self):
+        """Test wrappers connect directly without a pool size"""
+        wrapper = PooledSQLiteWrapper(dict(self.settings, POOL={}), "unpooled")
+        wrapper.ensure_connection()
+        wrapper.close()
+
+        self.assertIsNone(wrapper.connection)
+        self.assertFalse(any(key[0] == "unpooled" for key in pools))
+
+    def test_database_switched(self):
+        """Test connections to a database aren't reused once NAME changes"""
+        first = self.wrapper()
+        first.ensure_connection()
+        connection = first.connection
+        first.close()
+
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        second = PooledSQLiteWrapper(dict(self.settings, NAME=path), "pooled")
+        second.ensure_connection()
+
+        self.assertIsNot(second.connection, connection)
+        self.assertIsNot(second.pool, first.pool)
+        second.close()
+
+    def test_test_database_destroyed(self):
+        """Test the pooled connections are closed before the test database is dropped"""
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        creation = PooledSQLiteCreation(wrapper)
+
+        with mock.patch.object(sqlite_creation.DatabaseCreation, "destroy_test_db"):
+            creation.destroy_test_db(self.path)
+
+        stats = wrapper.pool.stats()
+        self.assertEqual((stats["size"], stats["closed"]), (0, 1))
+
+    def test_pool_exhausted(self):
+        """Test wrappers raise a database error when the pool is exhausted"""
+        first = self.wrapper()
+        first.ensure_connection()
+
+        with self.assertRaises(OperationalError):
+            self.wrapper().ensure_connection()
+
+        first.close()
+
+    def test_closed_in_transaction(self):
+        """Test connections closed inside a transaction aren't shared"""
+        first = self.wrapper()
+        first.ensure_connection()
+        first.in_atomic_block = True
+        first.close()
+
+        self.assertEqual(self.wrapper().pool.stats()["closed"], 1)
+
+    def test_close_all_connections(self):
+        """Test the connections of the pools are closed, e.g. before forking"""
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        wrapper.close()
+
+        with mock.patch("core.db.pool.connections") as connections:
+            close_all_connections()
+
+        connections.close_all.assert_called_once_with()
+        stats = self.wrapper().pool.stats()
+        self.assertEqual((stats["idle"], stats["closed"]), (0, 1))
+
+
+class HealthCheckTests(TestCase):
+    """Test the health checks of persistent connections"""
+
+    def setUp(self):
+        health.reset()
+
+    def wrapper(self):
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        wrapper = HealthCheckedSQLiteWrapper(
+            database_settings(NAME=path, CONN_HEALTH_CHECKS=True), "other"
+        )
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+
+        return wrapper
+
+    def start_request(self, *wrappers):
+        with mock.patch("core.db.health.connections") as connections:
+            connections.all.return_value = wrappers
+            health.check_connections()
+
+    def test_unusable_connection_replaced(self):
+        """Test broken persistent connections are reopened when first used"""
+        wrapper = self.wrapper()
+        connection = wrapper.connection
+
+        self.start_request(wrapper)
+        with mock.patch.object(wrapper, "is_usable", return_value=False):
+            wrapper.cursor().execute("SELECT 1")
+
+        self.assertIsNotNone(wrapper.connection)
+        self.assertIsNot(wrapper.connection, connection)
+        self.assertEqual(health._counters["other", "reused"], 1)
+        self.assertEqual(health._counters["other", "failed_checks"], 1)
+
+    def test_checked_once_when_used(self):
+        """Test connections are checked once per request, unused ones never"""
+        used, unused = self.wrapper(), self.wrapper()
+
+        self.start_request(used, unused)
+        with mock.patch.object(used, "is_usable", return_value=True) as is_usable:
+            with mock.patch.object(unused, "is_usable") as unused_is_usable:
+                for i in range(2):
+                    used.cursor().execute("SELECT 1")
+
+        self.assertEqual(is_usable.call_count, 1)
+        unused_is_usable.assert_not_called()
+        self.assertEqual(health._counters["other", "reused"], 1)
+
+    def test_metrics_include_databases(self):
+        """Test the metrics endpoint reports the database connections"""
+        admin = get_user_model().objects.create_superuser(
+            "admin@londonappdev.com", "password123"
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        res = client.get(reverse("metrics"))
+
+        self.assertIn("default", res.data["databases"])
+        self.assertIn("opened", res.data["databases"]["default"])
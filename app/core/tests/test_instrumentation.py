@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.instrumentation import Histogram
+from core.models import Recipe
+
+METRICS_URL = reverse("metrics")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class HistogramTests(TestCase):
+    """Test the fixed bucket histogram"""
+
+    def test_percentiles(self):
+        """Test percentiles report the upper bound of their bucket"""
+        histogram = Histogram((1, 10, 100))
+        for value in [0.5] * 90 + [7] * 9 + [500]:
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot["count"], 100)
+        self.assertEqual(snapshot["p50"], 1)
+        self.assertEqual(snapshot["p99"], 10)
+        self.assertEqual(snapshot["max"], 500)
+        self.assertEqual(snapshot["buckets"], [[1, 90], [10, 9], [100, 0], [None, 1]])
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Test the per-request metrics"""
+
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test responses report their DB, serializer and total time"""
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=5, price=1)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('desc="', res["Server-Timing"])
+        self.assertIn("serializer;dur=", res["Server-Timing"])
+        self.assertIn("total;dur=", res["Server-Timing"])
+
+    @override_settings(INSTRUMENTATION={"SERVER_TIMING": False})
+    def test_server_timing_disabled(self):
+        """Test the Server-Timing header can be turned off"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_records_view_metrics(self):
+        """Test requests are aggregated per view"""
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=5, price=1)
+        self.client.get(RECIPES_URL, {"paginate": 0})
+        res = self.client.get(RECIPES_URL, {"paginate": 0, "page_size": 10})
+
+        views = instrumentation.registry.snapshot()
+        metrics = views["GET recipe:recipe-list"]
+
+        self.assertEqual(metrics["wall_ms"]["count"], 2)
+        self.assertGreater(metrics["queries"]["max"], 0)
+        self.assertGreater(metrics["serializer_ms"]["sum"], 0)
+        self.assertEqual(metrics["response_bytes"]["max"], len(res.content))
+
+    def test_metrics_requires_admin(self):
+        """Test only staff users can read the metrics"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_dump_and_reset(self):
+        """Test admins can dump and reset the metrics"""
+        admin = get_user_model().objects.create_superuser(
+            "admin@londonappdev.com", "testpass"
+        )
+        self.client.force_authenticate(admin)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("GET recipe:recipe-list", res.data["views"])
+        self.assertIn("hits", res.data["token_cache"])
+
+        res = self.client.delete(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(instrumentation.registry.snapshot()), ["DELETE metrics"])
@@ -0,0 +1,110 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+@skipIf(renderers.orjson is None, "orjson isn't installed")
+class FastJSONRendererTests(TestCase):
+    """Test the fast renderer writes exactly what JSONRenderer does"""
+
+    def assertSameJSON(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_api_values(self):
+        """Test the values serializers return are rendered the same"""
+        now = timezone.now()
+        self.assertSameJSON(
+            {
+                "id": 1,
+                "title": 'Curry "hot" \\ Ω\n\t\x01',
+                "price": Decimal("5.50"),
+                "created": now,
+                "naive": now.replace(tzinfo=None),
+                "day": now.date(),
+                "time": datetime.time(10, 30, 5, 120),
+                "duration": datetime.timedelta(minutes=90),
+                "uuid": uuid.uuid4(),
+                "lazy": gettext_lazy("Sample"),
+                "tags": (1, 2, 3),
+                "empty": [{}, [], None, True, False],
+            }
+        )
+
+    def test_line_separators_escaped(self):
+        """Test U+2028 and U+2029 are escaped like JSONRenderer does"""
+        self.assertSameJSON({"name": "a\u2028b\u2029c"})
+
+    def test_floats(self):
+        """Test floats are written in the same notation"""
+        values = [0.0, -0.0, 0.1, 1.5, 1e15, 1e16, 1.5e300, 1e-4, 1e-5, -2.5e-7]
+        for value in values:
+            self.assertSameJSON({"value": value, "list": [value]})
+            self.assertSameJSON(value)
+
+    def test_unsupported_values(self):
+        """Test values orjson can't encode fall back to JSONRenderer"""
+        self.assertSameJSON({1: "a", None: "b"})
+        self.assertSameJSON({"big": 2**70})
+
+    def test_indented(self):
+        """Test pretty printed output"""
+        self.assertSameJSON({"a": [1, 2]}, "application/json; indent=4")
+
+    def test_none(self):
+        """Test no data renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_without_orjson(self):
+        """Test the renderer works when orjson isn't installed"""
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertSameJSON({"value": 1e16, "name": "a\u2028b"})
+
+
+@skipIf(parsers.orjson is None, "orjson isn't installed")
+class FastJSONParserTests(TestCase):
+    """Test the fast parser reads exactly what JSONParser does"""
+
+    def parse(self, parser, body):
+        try:
+            return parser.parse(io.BytesIO(body))
+        except ParseError as exc:
+            return str(exc.detail)
+
+    def assertSameData(self, body):
+        fast = self.parse(FastJSONParser(), body)
+        self.assertEqual(fast, self.parse(JSONParser(), body))
+
+        return fast
+
+    def test_parse(self):
+        """Test valid bodies parse to the same data"""
+        self.assertSameData(b'{"title": "Curry \\u00e9", "tags": [1, 2]}')
+        self.assertSameData(b'{"a": 1, "a": 2, "price": 1.5e-7}')
+        self.assertSameData(b'{"big": 123456789012345678901234567890}')
+        self.assertSameData(b'"\\ud800"')
+
+    def test_parse_errors(self):
+        """Test invalid bodies raise the same errors"""
+        for body in (b"{", b'{"a": NaN}', b"[1,]", b"\xff"):
+            self.assertIn("JSON parse error", self.assertSameData(body))
+
+    def test_without_orjson(self):
+        """Test the parser works when orjson isn't installed"""
+        with mock.patch.object(parsers, "orjson", None):
+            self.assertEqual(self.assertSameData(b'{"a": [1]}'), {"a": [1]})
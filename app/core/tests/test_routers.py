@@ -0,0 +1,217 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.db import routers
+from core.db.routers import PrimaryReplicaRouter
+from core.models import Tag, Recipe
+
+REPLICA = "replica"
+RECIPES_URL = reverse("recipe:recipe-list")
+EXPORT_URL = reverse("recipe:recipe-export")
+ME_URL = reverse("user:me")
+TOKEN_URL = reverse("user:token")
+REPLICA_SETTINGS = {
+    "ALIASES": [REPLICA],
+    "STICKY_SECONDS": 60,
+    "CACHE_ALIAS": "default",
+}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICA_SETTINGS)
+class ReplicaRoutingTests(TestCase):
+    """Test reads of safe requests go to the replica, a second SQLite DB"""
+
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[REPLICA] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+        connections.ensure_defaults(REPLICA)
+        connections.prepare_test_settings(REPLICA)
+        call_command("migrate", database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass", name="Test"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.replicate(self.user, self.token)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def replicate(self, *objs):
+        """Copy rows of the primary to the replica"""
+        for obj in objs:
+            obj.save(using=REPLICA)
+            obj._state.db = DEFAULT_DB_ALIAS
+
+    def recipe_titles(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def test_safe_requests_read_replica(self):
+        """Test lists are read from the replica"""
+        Recipe.objects.using(REPLICA).create(
+            user_id=self.user.pk, title="Replicated", time_minutes=5, price=1
+        )
+
+        self.assertEqual(self.recipe_titles(), ["Replicated"])
+
+    def test_export_streams_from_replica(self):
+        """Test names streamed after the request was routed come from the replica"""
+        recipe = Recipe.objects.using(REPLICA).create(
+            user_id=self.user.pk, title="Replicated", time_minutes=5, price=1
+        )
+        tag = Tag.objects.using(REPLICA).create(user_id=self.user.pk, name="Vegan")
+        Recipe.tags.through.objects.using(REPLICA).create(
+            recipe_id=recipe.pk, tag_id=tag.pk
+        )
+
+        res = self.client.get(EXPORT_URL)
+        item = json.loads(b"".join(res.streaming_content))
+
+        self.assertEqual((item["title"], item["tags"]), ("Replicated", ["Vegan"]))
+
+    def test_writes_stick_to_primary(self):
+        """Test clients read their own writes until the sticky window ends"""
+        payload = {"title": "Fresh", "time_minutes": 5, "price": "1.00"}
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Recipe.objects.using(REPLICA).exists())
+
+        self.assertEqual(self.recipe_titles(), ["Fresh"])
+
+        cache.clear()
+        self.assertEqual(self.recipe_titles(), [])
+
+    def test_lagging_responses_not_cached(self):
+        """Test lists read from the replica right after a write aren't cached"""
+        payload = {"title": "Fresh", "time_minutes": 5, "price": "1.00"}
+        self.client.post(RECIPES_URL, payload)
+
+        other = APIClient()
+        other.force_authenticate(self.user)
+        res = other.get(RECIPES_URL, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(res.data["results"], [])
+
+        self.assertEqual(self.recipe_titles(), ["Fresh"])
+
+    def test_user_updates_stick_to_primary(self):
+        """Test the user reads their own profile changes"""
+        res = self.client.patch(ME_URL, {"name": "Renamed"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(ME_URL).data["name"], "Renamed")
+
+        cache.clear()
+        token_cache.clear()
+        self.assertEqual(self.client.get(ME_URL).data["name"], "Test")
+
+    def test_token_not_replicated_yet(self):
+        """Test tokens missing on the replica are looked up on the primary"""
+        token = Token.objects.create(
+            user=get_user_model().objects.create_user("new@londonappdev.com", "pass")
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], "new@londonappdev.com")
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are still rejected"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token missing")
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_sticks_to_primary(self):
+        """Test obtaining a token counts as a write"""
+        res = self.client.post(
+            TOKEN_URL, {"email": "test@londonappdev.com", "password": "testpass"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(routers.is_sticky(self.client_key()))
+
+    def client_key(self):
+        request = self.client.get(RECIPES_URL).wsgi_request
+
+        return routers.client_key(request)
+
+
+class PrimaryReplicaRouterTests(TestCase):
+    """Test the database router"""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    @override_settings(DATABASE_REPLICAS=REPLICA_SETTINGS)
+    def test_routing(self):
+        """Test reads only go to replicas inside replica routing"""
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+        with routers.routing(replica=True) as state:
+            self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+
+            with routers.primary():
+                self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+            self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+            self.assertEqual(self.router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+        self.assertTrue(state.wrote)
+        self.assertIsNone(routers.current())
+
+    @override_settings(DATABASE_REPLICAS=dict(REPLICA_SETTINGS, ALIASES=["r1", "r2"]))
+    def test_replica_chosen_once(self):
+        """Test the reads of a request all go to the same replica"""
+        with mock.patch("core.db.routers.random.choice", return_value="r2") as choice:
+            with routers.routing(replica=True):
+                aliases = {self.router.db_for_read(Recipe) for _ in range(5)}
+
+        self.assertEqual(aliases, {"r2"})
+        choice.assert_called_once_with(["r1", "r2"])
+
+    @override_settings(DATABASE_REPLICAS=REPLICA_SETTINGS)
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary"""
+        self.assertFalse(self.router.allow_migrate(REPLICA, "core"))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, "core"))
+
+    def test_without_replicas(self):
+        """Test reads go to the primary when no replica is configured"""
+        with routers.routing(replica=True):
+            self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
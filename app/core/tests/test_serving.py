@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core import serving
+
+
+class AvailableCPUsTests(SimpleTestCase):
+    """Test counting the CPUs the server can use"""
+
+    def cgroup(self, files):
+        return patch.object(serving, "read_first_line", side_effect=files.get)
+
+    @patch("os.sched_getaffinity", return_value={0, 1, 2, 3}, create=True)
+    def test_cgroup_v2_limit(self, affinity):
+        """Test a cgroup v2 quota caps the CPUs, rounded up"""
+        with self.cgroup({serving.CGROUP_V2_CPU_MAX: "150000 100000"}):
+            self.assertEqual(serving.available_cpus(), 2)
+
+        with self.cgroup({serving.CGROUP_V2_CPU_MAX: "max 100000"}):
+            self.assertEqual(serving.available_cpus(), 4)
+
+    @patch("os.sched_getaffinity", return_value={0, 1, 2, 3}, create=True)
+    def test_cgroup_v1_limit(self, affinity):
+        """Test a cgroup v1 quota caps the CPUs"""
+        files = {serving.CGROUP_V1_QUOTA: "50000", serving.CGROUP_V1_PERIOD: "100000"}
+        with self.cgroup(files):
+            self.assertEqual(serving.available_cpus(), 1)
+
+        files[serving.CGROUP_V1_QUOTA] = "-1"
+        with self.cgroup(files):
+            self.assertEqual(serving.available_cpus(), 4)
+
+    @patch("os.sched_getaffinity", return_value={0, 1}, create=True)
+    def test_affinity(self, affinity):
+        """Test CPUs outside the affinity mask aren't counted"""
+        with self.cgroup({}):
+            self.assertEqual(serving.available_cpus(), 2)
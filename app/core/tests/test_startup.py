@@ -0,0 +1,88 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app import settings_api
+from core import startup
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     encodings.idna
+import time:       300 |        400 |   encodings
+import time:       500 |        900 | django
+"""
+
+
+class StartupProfileTests(TestCase):
+    """Test profiling the start of a worker"""
+
+    def test_parse_importtime(self):
+        """Test -X importtime output is parsed with the nesting depth"""
+        modules = startup.parse_importtime(IMPORTTIME)
+
+        self.assertEqual(
+            modules,
+            [("encodings.idna", 2, 100), ("encodings", 1, 400), ("django", 0, 900)],
+        )
+        self.assertEqual(startup.import_ms(modules), 0.9)
+
+    def test_api_profile_startup(self):
+        """Test API workers don't import what they only need lazily"""
+        out = StringIO()
+        call_command("profile_startup", "--json", stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["settings"], "app.settings_api")
+        self.assertEqual(report["eager_modules"], [])
+        self.assertGreater(report["import_ms"], 0)
+
+    def test_import_budget(self):
+        """Test startup over the import time budget fails"""
+        with self.assertRaisesRegex(CommandError, "budget"):
+            call_command("profile_startup", "--max-import-ms=1", stdout=StringIO())
+
+
+@override_settings(
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    ROOT_URLCONF=settings_api.ROOT_URLCONF,
+    REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+)
+class APIProfileTests(TestCase):
+    """Test the API works with the middleware and URLs of the API profile"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("test@londonappdev.com", "pass")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+        )
+
+    def test_recipes(self):
+        """Test creating and listing recipes"""
+        payload = {
+            "title": "Soup",
+            "time_minutes": 5,
+            "price": "1.00",
+            "tags": [],
+            "ingredients": [],
+        }
+        res = self.client.post("/api/recipe/recipes/", payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get("/api/recipe/recipes/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(len(res.json()["results"]), 1)
+
+    def test_no_admin(self):
+        """Test the admin isn't routed"""
+        res = self.client.get("/admin/")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,177 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+TOKEN_URL = reverse("user:token")
+ME_URL = reverse("user:me")
+TAGS_URL = reverse("recipe:tag-list")
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def throttle_rates(**rates):
+    """Return settings overriding the throttle rates, the others unset"""
+    scopes = settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+
+    return override_settings(
+        REST_FRAMEWORK=dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES=dict(dict.fromkeys(scopes), **rates),
+        )
+    )
+
+
+class TokenBucketTests(TestCase):
+    """Test the token bucket arithmetic and stores"""
+
+    def test_take(self):
+        """Test buckets allow bursts, then refill at the rate"""
+        bucket, wait = throttling.take(None, 100, capacity=2, refill_rate=0.5)
+        self.assertEqual((bucket, wait), ((1, 100), 0))
+
+        bucket, wait = throttling.take(bucket, 100, capacity=2, refill_rate=0.5)
+        self.assertEqual((bucket, wait), ((0, 100), 0))
+
+        bucket, wait = throttling.take(bucket, 101, capacity=2, refill_rate=0.5)
+        self.assertEqual((bucket, wait), ((0.5, 101), 1))
+
+        bucket, wait = throttling.take(bucket, 102, capacity=2, refill_rate=0.5)
+        self.assertEqual((bucket, wait), ((0, 102), 0))
+
+    def test_take_caps_tokens(self):
+        """Test idle buckets don't fill up past their capacity"""
+        bucket, wait = throttling.take((0, 0), 1000, capacity=2, refill_rate=1)
+
+        self.assertEqual((bucket, wait), ((1, 1000), 0))
+
+    def test_local_store_is_bounded(self):
+        """Test the local store drops the least recently used buckets"""
+        store = throttling.LocalBucketStore(max_size=2)
+
+        for key in ("a", "b", "a", "c"):
+            store.consume(key, 1, 1 / 60)
+
+        self.assertEqual(list(store._buckets), ["a", "c"])
+
+    def test_cache_store(self):
+        """Test buckets can be shared through a cache"""
+        store = throttling.CacheBucketStore(caches["default"])
+        caches["default"].delete("bucket")
+
+        self.assertEqual(store.consume("bucket", 1, 1 / 60), 0)
+        self.assertGreater(store.consume("bucket", 1, 1 / 60), 0)
+
+
+class ThrottleTests(TestCase):
+    """Test requests are throttled per client"""
+
+    def setUp(self):
+        throttling.local_store.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+
+    def login(self, **extra):
+        return self.client.post(
+            TOKEN_URL,
+            {"email": "test@londonappdev.com", "password": "testpass"},
+            **extra,
+        )
+
+    @throttle_rates(login="2/min")
+    def test_login_throttled(self):
+        """Test logins are throttled per IP address with a Retry-After"""
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "30")
+        other = self.login(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    @throttle_rates(user="1/min")
+    def test_user_throttled(self):
+        """Test authenticated requests are throttled per user"""
+        other = get_user_model().objects.create_user("other@londonappdev.com", "pw")
+        self.client.force_authenticate(self.user)
+        self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    @throttle_rates(write="1/min")
+    def test_write_throttled(self):
+        """Test only unsafe requests use the write rate"""
+        self.client.force_authenticate(self.user)
+
+        first = self.client.post(TAGS_URL, {"name": "Vegan"})
+        second = self.client.post(TAGS_URL, {"name": "Dessert"})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+    def test_no_rates(self):
+        """Test scopes without a rate aren't throttled"""
+        for _ in range(5):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    @throttle_rates(login="1/min")
+    @override_settings(THROTTLING={"MAX_KEYS": 100, "CACHE_ALIAS": "default"})
+    def test_shared_store(self):
+        """Test buckets are kept in the cache when one is configured"""
+        caches["default"].clear()
+        self.login()
+
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(len(throttling.local_store._buckets), 0)
+
+
+class ConcurrencyLimitTests(TestCase):
+    """Test requests are shed past the in-flight limit"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @override_settings(CONCURRENCY_LIMIT={"MAX_IN_FLIGHT": 1, "RETRY_AFTER": 2})
+    def test_overloaded(self):
+        """Test requests past the limit get a 503 with a Retry-After"""
+        with mock.patch.object(throttling.limiter, "in_flight", 1):
+            res = self.client.post(TOKEN_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "2")
+
+    @override_settings(CONCURRENCY_LIMIT={"MAX_IN_FLIGHT": 1, "RETRY_AFTER": 2})
+    def test_released(self):
+        """Test finished requests leave room for the next ones"""
+        self.client.post(TOKEN_URL, {})
+        res = self.client.post(TOKEN_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(throttling.limiter.stats()["in_flight"], 0)
+
+    @override_settings(CONCURRENCY_LIMIT={"MAX_IN_FLIGHT": 1, "RETRY_AFTER": 2})
+    def test_streamed_released_when_closed(self):
+        """Test streamed responses stay in flight until they are closed"""
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@londonappdev.com", "pass")
+        )
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(throttling.limiter.stats()["in_flight"], 1)
+        b"".join(res.streaming_content)
+        self.assertEqual(throttling.limiter.stats()["in_flight"], 0)
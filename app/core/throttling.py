@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+BUCKET_KEY = "throttle:{scope}:{ident}"
+
+
+def take(bucket, now, capacity, refill_rate):
+    """Take a token from a bucket of (tokens, updated)
+
+    Returns the new bucket and the seconds to wait for the next token, 0 if
+    the token was taken. A missing bucket is full.
+    """
+    tokens, updated = bucket if bucket is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """Bounded, thread safe LRU of token buckets in this process
+
+    A bucket is two floats, unlike the request history of DRF's throttles,
+    and the least recently used ones are dropped past `max_size`. A dropped
+    bucket is full again, which only ever lets a client through.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        """Take a token, returning the seconds to wait if there was none"""
+        with self._lock:
+            bucket, wait = take(
+                self._buckets.get(key), time.monotonic(), capacity, refill_rate
+            )
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets in a cache shared by every worker
+
+    The read and write of a bucket aren't atomic, so concurrent requests of
+    a client on different workers may take the same token. Buckets expire
+    once they would be full again.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def consume(self, key, capacity, refill_rate):
+        """Take a token, returning the seconds to wait if there was none"""
+        bucket, wait = take(self.cache.get(key), time.time(), capacity, refill_rate)
+        self.cache.set(key, bucket, int((capacity - bucket[0]) / refill_rate) + 1)
+
+        return wait
+
+
+local_store = LocalBucketStore(max_size=settings.THROTTLING["MAX_KEYS"])
+
+
+def get_store():
+    """Return the shared bucket store if a cache is configured, else the local one"""
+    alias = settings.THROTTLING.get("CACHE_ALIAS")
+
+    return CacheBucketStore(caches[alias]) if alias else local_store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Throttle allowing bursts of the rate's number of requests
+
+    A rate of "10/min" lets a client make 10 requests at once, then one
+    every 6 seconds. Rates are read from DEFAULT_THROTTLE_RATES, a scope
+    without a rate isn't throttled.
+    """
+
+    def __init__(self):
+        # the rate depends on the view for scoped throttles
+        pass
+
+    def get_rate(self):
+        # DRF binds THROTTLE_RATES at import, which ignores setting changes
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+        return super().get_rate()
+
+    def get_ident(self, request):
+        """Return the user of the request, or its address if anonymous"""
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+
+        return f"ip:{super().get_ident(request)}"
+
+    def get_scope(self, request, view):
+        """Return the scope of the request, None not to throttle it"""
+        return self.scope
+
+    def get_cache_key(self, request, view):
+        return BUCKET_KEY.format(scope=self.scope, ident=self.get_ident(request))
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+
+        if self.scope is None:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        if self.rate is None:
+            return True
+
+        self.wait_seconds = get_store().consume(
+            self.get_cache_key(request, view),
+            self.num_requests,
+            self.num_requests / self.duration,
+        )
+
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonThrottle(TokenBucketThrottle):
+    """Throttle anonymous requests per IP address"""
+
+    scope = "anon"
+
+    def get_scope(self, request, view):
+        return None if request.user and request.user.is_authenticated else self.scope
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Throttle authenticated requests per user"""
+
+    scope = "user"
+
+    def get_scope(self, request, view):
+        return self.scope if request.user and request.user.is_authenticated else None
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Throttle unsafe requests per user, or per IP address if anonymous"""
+
+    scope = "write"
+
+    def get_scope(self, request, view):
+        return None if request.method in SAFE_METHODS else self.scope
+
+
+class ScopedThrottle(TokenBucketThrottle):
+    """Throttle the views with a `throttle_scope` per user or IP address"""
+
+    def get_scope(self, request, view):
+        return getattr(view, "throttle_scope", None)
+
+
+class ConcurrencyLimiter:
+    """Count the requests in flight in this process"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        """Count a request in, False if `limit` requests are in flight"""
+        with self._lock:
+            if self.in_flight >= limit:
+                self.shed += 1
+                return False
+
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self.in_flight, "peak": self.peak, "shed": self.shed}
+
+    def reset(self):
+        with self._lock:
+            self.peak = self.in_flight
+            self.shed = 0
+
+
+limiter = ConcurrencyLimiter()
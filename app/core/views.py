@@ -0,0 +1,32 @@
+from rest_framework import permissions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import instrumentation, throttling
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.db import health
+
+
+class MetricsView(APIView):
+    """Dump or reset the request metrics of this process"""
+
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(
+            {
+                "views": instrumentation.registry.snapshot(),
+                "token_cache": token_cache.stats(),
+                "databases": health.stats(),
+                "concurrency": throttling.limiter.stats(),
+            }
+        )
+
+    def delete(self, request):
+        instrumentation.registry.reset()
+        health.reset()
+        throttling.limiter.reset()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration of the production server, see `manage.py serve`.
+
+Every setting can be overridden on the gunicorn command line.
+"""
+
+import gc
+import os
+
+from core.serving import available_cpus, default_workers
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY") or default_workers(available_cpus()))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# import the project once in the master, workers share its modules copy-on-write
+preload_app = True
+
+# recycle workers after a number of requests, jittered so they don't all
+# restart at once, and let them finish their requests when stopped
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# worker heartbeats in memory, docker's overlay filesystem can stall them
+worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    from core.db.pool import close_all_connections
+
+    # database connections of the master would be shared by every worker
+    close_all_connections()
+
+    # the garbage collector writes to every object it tracks, which would
+    # copy the preloaded modules into each worker
+    gc.freeze()
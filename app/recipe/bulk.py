@@ -0,0 +1,336 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from recipe import cache, names
+from recipe.serializers import BulkManyRelatedField
+
+NOT_A_LIST = _("Expected a list of items.")
+TOO_MANY = _("Ensure this list has no more than {max_items} items.")
+NOT_FOUND = _("Not found.")
+MISSING_ID = _("This field is required.")
+INVALID_ID = _("Incorrect type. Expected pk value, received {data_type}.")
+
+
+class BulkMixin:
+    """Create, update and delete a batch of objects in one request
+
+    Items are validated in a single pass with related objects resolved
+    once for the whole batch. Writes happen in one transaction using
+    bulk inserts/updates, and the response holds one result per item.
+    """
+
+    bulk_max_items = 1000
+
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create (POST), update (PATCH) or delete (DELETE) many objects"""
+        items = request.data
+
+        if not isinstance(items, list):
+            return Response(
+                {"non_field_errors": [NOT_A_LIST]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(items) > self.bulk_max_items:
+            message = TOO_MANY.format(max_items=self.bulk_max_items)
+            return Response(
+                {"non_field_errors": [message]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == "POST":
+            return self.bulk_create(items)
+        if request.method == "PATCH":
+            return self.bulk_update(items)
+
+        return self.bulk_destroy(items)
+
+    def get_bulk_queryset(self):
+        """Return the objects a batch may touch"""
+        return self.queryset.filter(user=self.request.user)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        """Return a serializer sharing the batch wide context"""
+        serializer_class = self.get_serializer_class()
+
+        return serializer_class(*args, context=self.bulk_context, **kwargs)
+
+    def prepare_bulk_context(self, items):
+        """Resolve every related id used in the batch with one query per field"""
+        self.bulk_context = self.get_serializer_context()
+        related_objects = {}
+
+        for name, field in self.get_serializer_class()().fields.items():
+            if not isinstance(field, BulkManyRelatedField) or field.read_only:
+                continue
+
+            pks = set()
+            for item in items:
+                values = item.get(name) if isinstance(item, dict) else None
+                if isinstance(values, list):
+                    pks.update(v for v in values if isinstance(v, (int, str)))
+
+            queryset = field.child_relation.get_queryset()
+            pk_field = queryset.model._meta.pk
+            clean = set()
+            for pk in pks:
+                try:
+                    clean.add(pk_field.to_python(pk))
+                except (TypeError, ValueError, ValidationError):
+                    # reported by the field while validating the item
+                    continue
+
+            related_objects[name] = queryset.in_bulk(clean)
+
+        self.bulk_context["related_objects"] = related_objects
+
+    def parse_ids(self, values):
+        """Return the primary keys of a batch and the errors of each item
+
+        Ids are converted like the primary key field does, so numeric
+        strings are accepted. Invalid ones are None with an error.
+        """
+        pk_field = self.queryset.model._meta.pk
+        pks = []
+        errors = []
+
+        for value in values:
+            if value is None:
+                pks.append(None)
+                errors.append({"id": [MISSING_ID]})
+                continue
+
+            try:
+                # bool is an int, but not an id
+                if isinstance(value, bool):
+                    raise TypeError
+                pks.append(pk_field.to_python(value))
+                errors.append({})
+            except (TypeError, ValueError, ValidationError):
+                message = INVALID_ID.format(data_type=type(value).__name__)
+                pks.append(None)
+                errors.append({"id": [message]})
+
+        return pks, errors
+
+    def split_validated_data(self, validated_data):
+        """Split validated data into concrete fields and many-to-many values"""
+        model = self.queryset.model
+        m2m_names = {field.name for field in model._meta.many_to_many}
+        fields = {k: v for k, v in validated_data.items() if k not in m2m_names}
+        m2m = {k: v for k, v in validated_data.items() if k in m2m_names}
+
+        return fields, m2m
+
+    def replace_m2m(self, objs_with_values, name, clear):
+        """Write the many-to-many rows of `name` with one delete and one insert"""
+        field = self.queryset.model._meta.get_field(name)
+        through = field.remote_field.through
+        source = f"{field.m2m_field_name()}_id"
+        target = f"{field.m2m_reverse_field_name()}_id"
+
+        if clear:
+            through.objects.filter(
+                **{f"{source}__in": [obj.pk for obj, values in objs_with_values]}
+            ).delete()
+
+        through.objects.bulk_create(
+            [
+                through(**{source: obj.pk, target: related.pk})
+                for obj, values in objs_with_values
+                for related in {value.pk: value for value in values}.values()
+            ]
+        )
+
+    def bulk_written(self, objs, created):
+        """Hook run in the write transaction, bulk writes don't send signals"""
+
+    def bulk_deleting(self, queryset):
+        """Hook run in the delete transaction, before the objects are deleted"""
+
+    def bulk_response(self, objs, status_code):
+        """Serialize the written objects with their relations prefetched"""
+        model = self.queryset.model
+        prefetch_related_objects(
+            objs, *[field.name for field in model._meta.many_to_many]
+        )
+        cache.bump_version(self.request.user.pk)
+        data = [self.get_bulk_serializer(obj).data for obj in objs]
+
+        return Response(data, status=status_code)
+
+    def validate_bulk_create(self, items):
+        """Return the serializers of a batch of new objects and their errors"""
+        self.prepare_bulk_context(items)
+        serializers = [self.get_bulk_serializer(data=item) for item in items]
+        errors = [
+            {} if serializer.is_valid() else serializer.errors
+            for serializer in serializers
+        ]
+
+        return serializers, errors
+
+    def bulk_conflict(self, exc, validate, items):
+        """Report the items a concurrent request made invalid since validating
+
+        e.g. by taking their name, otherwise `exc` is raised again.
+        """
+        serializers, errors = validate(items)
+
+        if not any(errors):
+            raise exc
+
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_create(self, items):
+        """Validate and insert a batch of new objects"""
+        serializers, errors = self.validate_bulk_create(items)
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.queryset.model
+        rows = [self.split_validated_data(s.validated_data) for s in serializers]
+        objs = [model(user=self.request.user, **fields) for fields, m2m in rows]
+
+        try:
+            with transaction.atomic():
+                names.resolve_relations(
+                    model, self.request.user.pk, [m2m for fields, m2m in rows]
+                )
+
+                if connection.features.can_return_ids_from_bulk_insert:
+                    model.objects.bulk_create(objs)
+                else:
+                    # primary keys are needed for the relation rows
+                    for obj in objs:
+                        obj.save()
+
+                for field in model._meta.many_to_many:
+                    self.replace_m2m(
+                        [
+                            (obj, m2m[field.name])
+                            for obj, (fields, m2m) in zip(objs, rows)
+                            if field.name in m2m
+                        ],
+                        field.name,
+                        clear=False,
+                    )
+
+                self.bulk_written(objs, created=True)
+        except IntegrityError as exc:
+            return self.bulk_conflict(exc, self.validate_bulk_create, items)
+
+        return self.bulk_response(objs, status.HTTP_201_CREATED)
+
+    def validate_bulk_update(self, items):
+        """Return the serializers of a batch of updates and their errors"""
+        self.prepare_bulk_context(items)
+        ids, errors = self.parse_ids(
+            [item.get("id") if isinstance(item, dict) else None for item in items]
+        )
+        instances = self.get_bulk_queryset().in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+        serializers = []
+
+        for index, (pk, item) in enumerate(zip(ids, items)):
+            if pk is None:
+                serializers.append(None)
+            elif pk not in instances:
+                serializers.append(None)
+                errors[index] = {"id": [NOT_FOUND]}
+            else:
+                serializer = self.get_bulk_serializer(
+                    instances[pk], data=item, partial=True
+                )
+                serializers.append(serializer)
+                errors[index] = {} if serializer.is_valid() else serializer.errors
+
+        return serializers, errors
+
+    def bulk_update(self, items):
+        """Validate and partially update a batch of existing objects"""
+        serializers, errors = self.validate_bulk_update(items)
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.queryset.model
+        now = timezone.now()
+        update_fields = {"updated_at"}
+        relations = {field.name: [] for field in model._meta.many_to_many}
+        objs = []
+
+        for serializer in serializers:
+            obj = serializer.instance
+            fields, m2m = self.split_validated_data(serializer.validated_data)
+
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.updated_at = now
+            update_fields.update(fields)
+
+            for name, values in m2m.items():
+                relations[name].append((obj, values))
+            objs.append(obj)
+
+        try:
+            with transaction.atomic():
+                names.resolve_relations(
+                    model,
+                    self.request.user.pk,
+                    [
+                        {name: values}
+                        for name, objs_with_values in relations.items()
+                        for obj, values in objs_with_values
+                    ],
+                )
+                model.objects.bulk_update(objs, sorted(update_fields))
+
+                for name, objs_with_values in relations.items():
+                    if objs_with_values:
+                        self.replace_m2m(objs_with_values, name, clear=True)
+
+                self.bulk_written(objs, created=False)
+        except IntegrityError as exc:
+            return self.bulk_conflict(exc, self.validate_bulk_update, items)
+
+        for obj in objs:
+            obj._prefetched_objects_cache = {}
+
+        return self.bulk_response(objs, status.HTTP_200_OK)
+
+    def bulk_destroy(self, ids):
+        """Delete a batch of objects given their ids"""
+        ids, errors = self.parse_ids(ids)
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_bulk_queryset().filter(pk__in=ids)
+
+        with transaction.atomic():
+            found = set(queryset.values_list("pk", flat=True))
+            self.bulk_deleting(queryset)
+            queryset.delete()
+
+        cache.bump_version(self.request.user.pk)
+
+        return Response(
+            [
+                {
+                    "id": pk,
+                    "status": status.HTTP_204_NO_CONTENT
+                    if pk in found
+                    else status.HTTP_404_NOT_FOUND,
+                }
+                for pk in ids
+            ],
+            status=status.HTTP_200_OK,
+        )
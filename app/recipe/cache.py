@@ -0,0 +1,153 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse
+from rest_framework import status
+
+from core.db import routers
+
+VERSION_KEY = "recipe:version:{user_id}"
+RESPONSE_KEY = "recipe:response:{user_id}:{version}:{digest}"
+WRITTEN_KEY = "recipe:written:{user_id}"
+
+# query parameters holding comma separated ids, where order doesn't matter
+LIST_PARAMS = ("tags", "ingredients")
+
+
+def get_cache():
+    """Return the cache backend used for recipe API responses"""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def new_version():
+    """Return a version that sorts after any version handed out before"""
+    return time.time_ns()
+
+
+def get_version(user_id):
+    """Return the current cache version of a user's recipe data"""
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate every cached response of a user in a single write"""
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the version was never set or got evicted
+        reset_version(user_id)
+
+    if routers.replica_aliases():
+        # replicas may not have the write yet, see storable()
+        cache.set(
+            WRITTEN_KEY.format(user_id=user_id),
+            1,
+            timeout=settings.DATABASE_REPLICAS["STICKY_SECONDS"],
+        )
+
+
+def bump_version_on_commit(user_id):
+    """Invalidate a user's cached responses for a write in progress
+
+    The version is bumped now and again once the transaction commits, so
+    responses stored in between, which may miss the write, aren't served.
+    """
+    bump_version(user_id)
+
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_version(user_id))
+
+
+def reset_version(user_id):
+    """Start a fresh version, e.g. when a user id is (re)used by a new user"""
+    get_cache().set(VERSION_KEY.format(user_id=user_id), new_version(), timeout=None)
+
+
+def storable(request):
+    """Return whether a response may be cached under the current version
+
+    Responses read from a replica shortly after the user wrote may miss
+    the write, they would be served until the next write otherwise.
+    """
+    if not routers.reading_from_replica():
+        return True
+
+    return get_cache().get(WRITTEN_KEY.format(user_id=request.user.pk)) is None
+
+
+def normalize_query_params(query_params):
+    """Return query params in a canonical, hashable order"""
+    normalized = []
+
+    for name, values in sorted(query_params.lists()):
+        if name in LIST_PARAMS:
+            values = [",".join(sorted(v.split(","))) for v in values]
+
+        normalized.append((name, tuple(sorted(values))))
+
+    return tuple(normalized)
+
+
+def response_key(request):
+    """Return the cache key of a response for the requesting user"""
+    parts = (
+        request.get_host(),
+        request.path,
+        request.accepted_media_type,
+        normalize_query_params(request.query_params),
+    )
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        version=get_version(request.user.pk),
+        digest=digest,
+    )
+
+
+class CachedListMixin:
+    """Serve rendered list responses from the per-user response cache"""
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+
+        key = response_key(request)
+        cached = get_cache().get(key)
+
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().list(request, *args, **kwargs)
+        response.response_cache_key = key
+
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(response, "response_cache_key", None)
+
+        if key and response.status_code == status.HTTP_200_OK and storable(request):
+            response.render()
+            get_cache().set(
+                key,
+                (response.content, response["Content-Type"]),
+                timeout=settings.RECIPE_CACHE_TIMEOUT,
+            )
+
+        return response
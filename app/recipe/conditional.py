@@ -0,0 +1,76 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+
+
+def make_etag(*parts):
+    """Return a quoted ETag for the given representation parts"""
+    return '"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """Answer recipe GETs with 304 when the client already has current data
+
+    The check runs a single indexed query on `updated_at` before any
+    serialization happens.
+    """
+
+    def list(self, request, *args, **kwargs):
+        marker = self.queryset.filter(user=request.user).aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+
+        return self.conditional_response(
+            request,
+            marker["last_modified"],
+            ("list", marker["count"], marker["last_modified"]),
+            super().list,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            last_modified = (
+                self.queryset.filter(user=request.user, pk=kwargs.get("pk"))
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            last_modified = None
+
+        if last_modified is None:
+            # let the regular view deal with missing objects
+            return super().retrieve(request, *args, **kwargs)
+
+        return self.conditional_response(
+            request,
+            last_modified,
+            ("detail", kwargs.get("pk"), last_modified),
+            super().retrieve,
+            *args,
+            **kwargs,
+        )
+
+    def conditional_response(
+        self, request, last_modified, state, view, *args, **kwargs
+    ):
+        """Return 304 if the client is current, else the response of `view`"""
+        etag = make_etag(request.accepted_media_type, *state)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+        if response is None:
+            response = view(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+
+        return response
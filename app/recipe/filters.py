@@ -0,0 +1,133 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Exists, OuterRef
+from rest_framework import serializers
+
+from core.models import Recipe
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+
+# query parameter -> (recipe field, lookup), served by the (user, field) indexes
+RANGE_FILTERS = {
+    "min_time": ("time_minutes", "gte"),
+    "max_time": ("time_minutes", "lte"),
+    "min_price": ("price", "gte"),
+    "max_price": ("price", "lte"),
+}
+
+
+def recipe_relation(field_name):
+    """Return the through model of a recipe relation and its column names"""
+    field = Recipe._meta.get_field(field_name)
+
+    return (
+        field.remote_field.through,
+        f"{field.m2m_field_name()}_id",
+        f"{field.m2m_reverse_field_name()}_id",
+    )
+
+
+# the range of the primary keys
+MAX_ID = 2**31 - 1
+
+
+def parse_ids(param, value):
+    """Return the ids of a comma separated query parameter"""
+    try:
+        ids = [int(id_) for id_ in value.split(",")]
+    except ValueError:
+        ids = None
+
+    if ids is None or not all(0 < id_ <= MAX_ID for id_ in ids):
+        raise serializers.ValidationError(
+            {param: ["Must be a comma separated list of ids."]}
+        )
+
+    return ids
+
+
+def parse_names(value):
+    """Return the names of a comma separated query parameter"""
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def filter_related_any(queryset, field_name, ids):
+    """Keep recipes linked to any of `ids` through `field_name`
+
+    Uses an EXISTS subquery instead of a join, so no DISTINCT is needed.
+    """
+    through, recipe_column, related_column = recipe_relation(field_name)
+    linked = through.objects.filter(
+        **{recipe_column: OuterRef("pk"), f"{related_column}__in": ids}
+    )
+
+    return queryset.annotate(**{f"has_{field_name}": Exists(linked)}).filter(
+        **{f"has_{field_name}": True}
+    )
+
+
+def filter_related_all(queryset, field_name, ids):
+    """Keep recipes linked to every one of `ids` through `field_name`
+
+    Uses one grouped subquery with HAVING COUNT, so the cost doesn't
+    grow with a join per requested id.
+    """
+    through, recipe_column, related_column = recipe_relation(field_name)
+    ids = set(ids)
+    linked = (
+        through.objects.filter(**{f"{related_column}__in": ids})
+        .values(recipe_column)
+        .annotate(matched=Count(related_column))
+        .filter(matched=len(ids))
+        .values(recipe_column)
+    )
+
+    return queryset.filter(pk__in=linked)
+
+
+def filter_related(queryset, field_name, ids, match):
+    """Keep recipes linked to any or all of `ids` through `field_name`"""
+    if match == MATCH_ALL:
+        return filter_related_all(queryset, field_name, ids)
+
+    return filter_related_any(queryset, field_name, ids)
+
+
+def parse_match(params):
+    """Return the `match` query parameter, `any` unless given"""
+    match = params.get("match") or MATCH_ANY
+
+    if match not in (MATCH_ANY, MATCH_ALL):
+        raise serializers.ValidationError(
+            {"match": [f"Must be '{MATCH_ANY}' or '{MATCH_ALL}'."]}
+        )
+
+    return match
+
+
+def filter_assigned(queryset, field_name, assigned):
+    """Keep tags/ingredients which are (or aren't) used by a recipe"""
+    through, recipe_column, related_column = recipe_relation(field_name)
+    linked = through.objects.filter(**{related_column: OuterRef("pk")})
+
+    return queryset.annotate(assigned=Exists(linked)).filter(assigned=assigned)
+
+
+def filter_ranges(queryset, params):
+    """Apply the min/max time and price query parameters"""
+    lookups = {}
+
+    for param, (field_name, lookup) in RANGE_FILTERS.items():
+        value = params.get(param)
+
+        if not value:
+            continue
+
+        try:
+            value = Recipe._meta.get_field(field_name).to_python(value)
+        except ValidationError as error:
+            raise serializers.ValidationError({param: error.messages})
+
+        lookups[f"{field_name}__{lookup}"] = value
+
+    return queryset.filter(**lookups)
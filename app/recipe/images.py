@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe import cache
+
+logger = logging.getLogger(__name__)
+
+# variant name -> (bounding box, Pillow format, file extension)
+VARIANTS = {
+    "thumbnail": ((200, 200), "JPEG", "jpg"),
+    "medium": ((800, 800), "JPEG", "jpg"),
+    "webp": ((800, 800), "WEBP", "webp"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_names(name):
+    """Return the storage names of all variants of an original image"""
+    base = os.path.splitext(name)[0]
+
+    return {
+        variant: f"{base}_{variant}.{ext}"
+        for variant, (size, fmt, ext) in VARIANTS.items()
+    }
+
+
+def ready_variants(value):
+    """Return {variant: storage name} of the variants recorded as generated"""
+    return json.loads(value) if value else {}
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_image(name, variants=""):
+    """Delete an original image and its variants once committed
+
+    `variants` are the ones recorded for it, variants of a failed or
+    unfinished job are deleted as well.
+    """
+    names = {name, *variant_names(name).values(), *ready_variants(variants).values()}
+    transaction.on_commit(lambda: delete_files(names))
+
+
+def encode_variant(image, size, fmt):
+    """Return the bytes of `image` resized to fit `size` in format `fmt`"""
+    from PIL import Image
+
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+
+    if fmt == "JPEG" and variant.mode != "RGB":
+        variant = variant.convert("RGB")
+
+    buffer = BytesIO()
+    variant.save(buffer, fmt, quality=85, optimize=fmt == "JPEG")
+
+    return buffer.getvalue()
+
+
+def generate_derivatives(name):
+    """Build and store every variant of the original image `name`
+
+    Only the variants stored successfully are recorded, and so served.
+    """
+    from PIL import Image
+
+    Image.init()
+
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+
+    stored = {}
+
+    for variant, target in variant_names(name).items():
+        size, fmt, ext = VARIANTS[variant]
+
+        if fmt not in Image.SAVE:
+            logger.warning("Pillow can't write %s, skipping %s", fmt, variant)
+            continue
+
+        try:
+            content = encode_variant(image, size, fmt)
+
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            stored[variant] = default_storage.save(target, ContentFile(content))
+        except Exception:
+            logger.exception("Failed to generate the %s of %s", variant, name)
+
+    record_variants(name, stored)
+
+
+def record_variants(name, stored):
+    """Expose the stored variants of `name`, unless the image was replaced"""
+    recipes = Recipe.objects.filter(image=name)
+    user_ids = list(recipes.values_list("user_id", flat=True))
+
+    # updated_at changes so conditional GETs see the variants
+    updated = recipes.update(
+        image_variants=json.dumps(stored), updated_at=timezone.now()
+    )
+
+    if not updated:
+        # replaced while its variants were generated
+        delete_files(stored.values())
+
+    for user_id in user_ids:
+        cache.bump_version(user_id)
+
+
+def _run(name):
+    try:
+        generate_derivatives(name)
+    except Exception:
+        logger.exception("Failed to generate derivatives of %s", name)
+
+
+def _run_in_worker(name):
+    try:
+        _run(name)
+    finally:
+        # worker threads outlive requests, don't keep a connection open
+        connection.close()
+
+
+def get_executor():
+    """Return the thread pool running derivative jobs"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix="recipe-images",
+            )
+
+    return _executor
+
+
+def schedule_derivatives(name):
+    """Generate the variants of `name` off the request thread once committed"""
+    if settings.IMAGE_DERIVATIVE_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, name))
+    else:
+        transaction.on_commit(lambda: _run(name))
+
+
+def wait_for_derivatives():
+    """Block until every scheduled derivative job has finished"""
+    global _executor
+
+    with _executor_lock:
+        executor, _executor = _executor, None
+
+    if executor is not None:
+        executor.shutdown(wait=True)
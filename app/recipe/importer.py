@@ -0,0 +1,292 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from core.db.pool import close_all_connections
+from core.models import Recipe
+from recipe import cache, names, search
+from recipe.export import chunked
+
+# the columns of recipe.export, ids are assigned anew
+FIELDS = ("title", "time_minutes", "price", "link")
+RELATIONS = ("tags", "ingredients")
+
+
+class InvalidRow(Exception):
+    """Raised for an input row that can't be imported"""
+
+
+def read_ndjson(lines):
+    """Yield the objects of JSON lines, skipping blank lines"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise InvalidRow(f"Line {number}: {exc}")
+
+        if not isinstance(row, dict):
+            raise InvalidRow(f"Line {number}: expected an object")
+
+        yield row
+
+
+def read_csv(lines):
+    """Yield the rows of a CSV with a header, decoding the name lists"""
+    for number, row in enumerate(csv.DictReader(lines), 1):
+        for name in RELATIONS:
+            try:
+                row[name] = json.loads(row.get(name) or "[]")
+            except ValueError as exc:
+                raise InvalidRow(f"Row {number}: {name} {exc}")
+
+        yield row
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+class NameResolver:
+    """Map the names of a user's tags or ingredients to primary keys
+
+    Names match whatever their case. Every existing name is loaded once,
+    missing ones are created with one bulk insert per batch.
+    """
+
+    def __init__(self, model, user_id):
+        self.model = model
+        self.user_id = user_id
+        self.ids = dict(names.lowered(model, user_id).values_list("lower_name", "pk"))
+        self.keys = {}
+
+    def resolve(self, batch_names):
+        """Create the unknown names of a batch"""
+        self.keys = names.name_keys(batch_names)
+        missing = [name for name, key in self.keys.items() if key not in self.ids]
+        created = names.get_or_create(self.model, self.user_id, missing)
+        self.ids.update((self.keys[name], obj.pk) for name, obj in created.items())
+
+    def get(self, name):
+        return self.ids[self.keys[name]]
+
+
+def clean_row(row, number):
+    """Return the validated fields and related names of an input row"""
+    recipe = Recipe(
+        **{name: row[name] for name in FIELDS if row.get(name) not in (None, "")}
+    )
+    related = {}
+
+    try:
+        recipe.clean_fields(exclude=["user", "image", "search_vector"])
+
+        for name in RELATIONS:
+            related[name] = clean_names(name, row.get(name) or [])
+    except ValidationError as exc:
+        raise InvalidRow(f"Row {number}: {exc.message_dict}")
+
+    return {name: getattr(recipe, name) for name in FIELDS}, related
+
+
+def clean_names(relation, values):
+    """Return the stripped names of a relation, without duplicates"""
+    model = Recipe._meta.get_field(relation).related_model
+    max_length = model._meta.get_field("name").max_length
+    unique = []
+
+    if not isinstance(values, list):
+        values = [None]
+
+    for value in values:
+        if not isinstance(value, str) or not 0 < len(value.strip()) <= max_length:
+            message = f"Expected a list of names of up to {max_length} characters."
+            raise ValidationError({relation: [message]})
+
+        if value.strip() not in unique:
+            unique.append(value.strip())
+
+    return unique
+
+
+def copy_rows(model, columns, rows):
+    """Insert rows with PostgreSQL's COPY, faster than INSERTs"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)".format(
+        table=quote(model._meta.db_table),
+        columns=", ".join(quote(column) for column in columns),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+def insert_batch(user_id, items, use_copy):
+    """Insert the recipes of a batch and their relations in one transaction
+
+    `items` are (fields, {relation: [related ids]}). Runs in worker
+    processes as well, so it only takes picklable arguments.
+    """
+    recipes = [Recipe(user_id=user_id, **fields) for fields, related in items]
+
+    with transaction.atomic():
+        if connection.features.can_return_ids_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            # primary keys are needed for the relation rows
+            for recipe in recipes:
+                recipe.save()
+
+        for name in RELATIONS:
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            columns = (
+                f"{field.m2m_field_name()}_id",
+                f"{field.m2m_reverse_field_name()}_id",
+            )
+            rows = [
+                (recipe.pk, pk)
+                for recipe, (fields, related) in zip(recipes, items)
+                for pk in related[name]
+            ]
+
+            if use_copy:
+                copy_rows(through, columns, rows)
+            else:
+                through.objects.bulk_create(
+                    [through(**dict(zip(columns, row))) for row in rows]
+                )
+
+        # bulk inserts don't send the signals indexing saved recipes
+        search.update_search_vectors([recipe.pk for recipe in recipes])
+
+    return len(recipes)
+
+
+class Importer:
+    """Import recipe rows for a user in batches
+
+    Each batch is committed on its own and the number of input rows done
+    is saved to `checkpoint`, so a failed import resumes after the last
+    committed batch. With several workers, batches are inserted by a pool
+    of processes while this one reads the input and creates the tags and
+    ingredients, so names are never created twice. Batches are committed
+    out of order then, so no checkpoint is saved and such an import can't
+    be resumed.
+    """
+
+    def __init__(self, user, batch_size=1000, workers=1, use_copy=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.workers = workers
+        self.use_copy = (
+            connection.vendor == "postgresql" if use_copy is None else use_copy
+        )
+        self.imported = 0
+        self.elapsed = 0
+
+    def run(self, rows, skip=0, checkpoint=None, progress=None):
+        """Import `rows` after the first `skip` ones, return the count imported"""
+        start = time.perf_counter()
+        batches = self.prepare_batches(rows, skip)
+        insert = self.insert_parallel if self.workers > 1 else self.insert_serial
+
+        try:
+            for count in insert(batches):
+                self.imported += count
+
+                if checkpoint and self.workers == 1:
+                    save_checkpoint(checkpoint, skip + self.imported)
+                self.elapsed = time.perf_counter() - start
+
+                if progress:
+                    progress(self.imported, self.elapsed)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            cache.bump_version(self.user.pk)
+
+        return self.imported
+
+    def prepare_batches(self, rows, skip):
+        """Yield validated batches of items with their related ids"""
+        resolvers = {
+            name: NameResolver(Recipe._meta.get_field(name).related_model, self.user.pk)
+            for name in RELATIONS
+        }
+        numbered = (
+            (number, row) for number, row in enumerate(rows, 1) if number > skip
+        )
+
+        for chunk in chunked(numbered, self.batch_size):
+            cleaned = [clean_row(row, number) for number, row in chunk]
+
+            for name, resolver in resolvers.items():
+                resolver.resolve(n for _, related in cleaned for n in related[name])
+
+            yield [
+                (
+                    fields,
+                    {
+                        # names differing by case share an object
+                        name: list(
+                            dict.fromkeys(resolvers[name].get(n) for n in related[name])
+                        )
+                        for name in RELATIONS
+                    },
+                )
+                for fields, related in cleaned
+            ]
+
+    def insert_serial(self, batches):
+        for items in batches:
+            yield insert_batch(self.user.pk, items, self.use_copy)
+
+    def insert_parallel(self, batches):
+        """Insert batches in worker processes, yielding counts in input order"""
+        # forked workers must not share this process' database connections
+        close_all_connections()
+
+        with multiprocessing.Pool(self.workers) as pool:
+            pending = deque()
+
+            for items in batches:
+                pending.append(
+                    pool.apply_async(insert_batch, (self.user.pk, items, self.use_copy))
+                )
+
+                # bound the batches held in memory
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
+
+
+def load_checkpoint(path):
+    """Return the number of input rows already imported"""
+    try:
+        with open(path) as f:
+            return json.load(f)["rows"]
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(path, rows):
+    """Save the number of rows imported, atomically"""
+    tmp = f"{path}.tmp"
+
+    with open(tmp, "w") as f:
+        json.dump({"rows": rows}, f)
+
+    os.replace(tmp, path)
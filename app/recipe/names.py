@@ -0,0 +1,104 @@
+from django.db import connection
+from django.db.models.functions import Lower
+
+# LOWER() calls per query, below the column limits of the databases
+KEYS_PER_QUERY = 1000
+
+
+def name_keys(names):
+    """Return {name: key} of tag/ingredient names, unique per user
+
+    Keys are computed by the database's LOWER(), like the unique indexes
+    of the names, which doesn't always agree with str.lower().
+    """
+    names = list(dict.fromkeys(names))
+    keys = {}
+
+    for start in range(0, len(names), KEYS_PER_QUERY):
+        chunk = names[start : start + KEYS_PER_QUERY]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT {}".format(", ".join(["LOWER(%s)"] * len(chunk))), chunk
+            )
+            keys.update(zip(chunk, cursor.fetchone()))
+
+    return keys
+
+
+def lowered(model, user_id):
+    """Return the tags or ingredients of a user with their name key"""
+    return model.objects.filter(user_id=user_id).annotate(lower_name=Lower("name"))
+
+
+def get_or_create(model, user_id, names):
+    """Return {name: object} of a user's tags or ingredients
+
+    Names are matched case insensitively. The missing ones are created with
+    one insert, spelled as first given, and rows created concurrently by
+    another request are picked up instead of failing.
+    """
+    keys = name_keys(names)
+    spellings = {}
+
+    for name, key in keys.items():
+        spellings.setdefault(key, name)
+
+    if not spellings:
+        return {}
+
+    queryset = lowered(model, user_id)
+    objects = {
+        obj.lower_name: obj for obj in queryset.filter(lower_name__in=list(spellings))
+    }
+    missing = [key for key in spellings if key not in objects]
+
+    if missing:
+        model.objects.bulk_create(
+            [model(user_id=user_id, name=spellings[key]) for key in missing],
+            ignore_conflicts=True,
+        )
+
+        # conflicting rows aren't returned by the insert, read them all back
+        objects.update(
+            (obj.lower_name, obj) for obj in queryset.filter(lower_name__in=missing)
+        )
+
+    return {name: objects[key] for name, key in keys.items()}
+
+
+def taken(model, user_id, keys):
+    """Return {name key: primary key} of the names a user already has"""
+    return dict(
+        lowered(model, user_id)
+        .filter(lower_name__in=list(keys))
+        .values_list("lower_name", "pk")
+    )
+
+
+def resolve_relations(model, user_id, values):
+    """Replace the names given for relations by objects, in place
+
+    `values` are dicts of validated data of `model`. The names of each
+    relation are resolved with one get-or-create for all of them.
+    """
+    for field in model._meta.many_to_many:
+        lists = [data[field.name] for data in values if field.name in data]
+        # ordered, new names are spelled as first given
+        names = dict.fromkeys(
+            value for related in lists for value in related if is_name(value)
+        )
+
+        if not names:
+            continue
+
+        objects = get_or_create(field.related_model, user_id, names)
+
+        for related in lists:
+            related[:] = [
+                objects[value] if is_name(value) else value for value in related
+            ]
+
+
+def is_name(value):
+    return isinstance(value, str)
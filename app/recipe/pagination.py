@@ -0,0 +1,41 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class OptionalPaginationMixin:
+    """Let clients opt out of pagination with `?paginate=0`"""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    unpaginated_query_param = "paginate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a page of results, or None when pagination is disabled"""
+        if request.query_params.get(self.unpaginated_query_param) == "0":
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class OptionalCursorPagination(OptionalPaginationMixin, CursorPagination):
+    """Keyset pagination which clients can opt out of"""
+
+    ordering = ("-id",)
+
+
+class AttrCursorPagination(OptionalCursorPagination):
+    """Paginate tags/ingredients by name, using the id to break ties"""
+
+    ordering = ("-name", "id")
+
+
+class RecipeCursorPagination(OptionalCursorPagination):
+    """Paginate recipes newest first"""
+
+    ordering = ("-id",)
+
+
+class SearchPagination(OptionalPaginationMixin, PageNumberPagination):
+    """Paginate search results by page, keeping their relevance order
+
+    Cursor pagination can only order by model fields, not by rank.
+    """
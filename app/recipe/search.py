@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q
+
+from core.models import Tag, Ingredient, Recipe
+
+# title matches rank above tag names, which rank above ingredient names
+UPDATE_SQL = """
+UPDATE {recipe} SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, {recipe}.title), 'A')
+    || setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg({tag}.name, ' ') FROM {tag}
+        JOIN {recipe_tags} ON {recipe_tags}.tag_id = {tag}.id
+        WHERE {recipe_tags}.recipe_id = {recipe}.id
+    ), '')), 'B')
+    || setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg({ingredient}.name, ' ') FROM {ingredient}
+        JOIN {recipe_ingredients}
+            ON {recipe_ingredients}.ingredient_id = {ingredient}.id
+        WHERE {recipe_ingredients}.recipe_id = {recipe}.id
+    ), '')), 'C')
+WHERE {recipe}.id = ANY(%(ids)s)
+"""
+
+
+def supports_full_text():
+    """Return whether the database has a tsvector search_vector column"""
+    return connection.vendor == "postgresql"
+
+
+def update_sql():
+    return UPDATE_SQL.format(
+        recipe=Recipe._meta.db_table,
+        tag=Tag._meta.db_table,
+        ingredient=Ingredient._meta.db_table,
+        recipe_tags=Recipe.tags.through._meta.db_table,
+        recipe_ingredients=Recipe.ingredients.through._meta.db_table,
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Rebuild the title, tag and ingredient search vectors of recipes"""
+    if not supports_full_text():
+        return
+
+    recipe_ids = list(recipe_ids)
+
+    if not recipe_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            update_sql(),
+            {"config": settings.RECIPE_SEARCH_CONFIG, "ids": recipe_ids},
+        )
+
+
+def search_recipes(queryset, terms):
+    """Keep recipes matching every search term, best matches first
+
+    PostgreSQL ranks matches of the indexed search vector, other
+    databases fall back to case insensitive substring matching.
+    """
+    if supports_full_text():
+        query = SearchQuery(terms, config=settings.RECIPE_SEARCH_CONFIG)
+
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-id")
+        )
+
+    for index, term in enumerate(terms.split()):
+        tag_match = f"tag_match_{index}"
+        ingredient_match = f"ingredient_match_{index}"
+        queryset = queryset.annotate(
+            **{
+                tag_match: Exists(
+                    Tag.objects.filter(recipe=OuterRef("pk"), name__icontains=term)
+                ),
+                ingredient_match: Exists(
+                    Ingredient.objects.filter(
+                        recipe=OuterRef("pk"), name__icontains=term
+                    )
+                ),
+            }
+        ).filter(
+            Q(title__icontains=term)
+            | Q(**{tag_match: True})
+            | Q(**{ingredient_match: True})
+        )
+
+    return queryset.order_by("-id")
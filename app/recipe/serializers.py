@@ -1,9 +1,163 @@
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
+from core.instrumentation import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
+from recipe import images, names
 
 
-class TagSerializer(serializers.ModelSerializer):
+def parse_related(item):
+    """Return ("name", name) or ("pk", pk) of an item of a related list
+
+    Numbers and numeric strings are primary keys, other strings names and
+    {"name": ...} objects names too, e.g. for names made of digits.
+    """
+    if isinstance(item, dict) and set(item) == {"name"}:
+        item = item["name"]
+
+        if isinstance(item, str):
+            return "name", item.strip()
+    elif isinstance(item, str) and not item.strip().isdigit():
+        return "name", item.strip()
+
+    return "pk", item
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Many related field which resolves all primary keys with one query
+
+    Related objects can be given by name as well, which are left as
+    strings for `names.resolve_relations` to get or create.
+    """
+
+    default_error_messages = dict(
+        serializers.ManyRelatedField.default_error_messages,
+        invalid_name=_("Ensure names have 1 to {max_length} characters."),
+    )
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        max_length = queryset.model._meta.get_field("name").max_length
+        values = []
+
+        for item in data:
+            kind, value = parse_related(item)
+
+            if kind == "name":
+                if not 0 < len(value) <= max_length:
+                    self.fail("invalid_name", max_length=max_length)
+            else:
+                try:
+                    value = queryset.model._meta.pk.to_python(value)
+                except (TypeError, ValueError, ValidationError):
+                    child.fail("incorrect_type", data_type=type(item).__name__)
+
+            values.append((kind, value))
+
+        pks = [value for kind, value in values if kind == "pk"]
+        # batch requests resolve the ids of all their items up front
+        objects = self.context.get("related_objects", {}).get(self.field_name)
+
+        if objects is None:
+            objects = queryset.in_bulk(pks) if pks else {}
+
+        for pk in pks:
+            if pk not in objects:
+                child.fail("does_not_exist", pk_value=pk)
+
+        return [value if kind == "name" else objects[value] for kind, value in values]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field which validates `many=True` in bulk"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class ImageVariantsField(serializers.Field):
+    """Read only field rendering the urls of the resized recipe images
+
+    Only the variants generated so far are listed, None until one is.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        request = self.context.get("request")
+        urls = {}
+
+        for variant, name in images.ready_variants(value).items():
+            url = default_storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
+
+class UniqueNameMixin:
+    """Reject names the user already has, whatever their case
+
+    Batches preload the keys of the names they use as `name_keys` and the
+    names taken as `taken_names`, and their items can't share a name either.
+    """
+
+    default_error_messages = {"name_taken": _("You already have this name.")}
+
+    def validate_name(self, value):
+        key = self.context.get("name_keys", {}).get(value)
+
+        if key is None:
+            key = names.name_keys([value])[value]
+
+        pk = getattr(self.instance, "pk", None)
+        taken = self.context.get("taken_names")
+
+        if taken is None:
+            user = self.context["request"].user
+            taken = names.taken(self.Meta.model, user.pk, [key])
+
+        if key in taken and taken[key] != pk:
+            self.fail("name_taken")
+
+        # a new object, later items of a batch can't take its name either
+        taken[key] = object() if pk is None else pk
+
+        return value
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            # created by a concurrent request since validating
+            raise serializers.ValidationError(
+                {"name": [self.error_messages["name_taken"]]}
+            )
+
+
+class TagSerializer(UniqueNameMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag object"""
 
     class Meta:
@@ -12,7 +166,9 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    UniqueNameMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """Serializer for Ingredient object"""
 
     class Meta:
@@ -21,19 +177,58 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for recipe objects"""
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for recipe objects
+
+    `fields` limits the representation to the given field names and
+    `expand` nests the full objects of the given relations.
+    """
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = BulkPrimaryKeyRelatedField(
         many=True, queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    image_variants = ImageVariantsField()
+
+    expandable_fields = {"tags": TagSerializer, "ingredients": IngredientSerializer}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        names.resolve_relations(Recipe, validated_data["user"].pk, [validated_data])
+
+        return super().create(validated_data)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        names.resolve_relations(Recipe, instance.user_id, [validated_data])
+
+        return super().update(instance, validated_data)
 
     class Meta:
         model = Recipe
 
-        fields = ("id", "title", "ingredients", "tags", "time_minutes", "price", "link")
-        read_only_fields = ("id",)
+        fields = (
+            "id",
+            "title",
+            "ingredients",
+            "tags",
+            "time_minutes",
+            "price",
+            "link",
+            "image",
+            "image_variants",
+        )
+        read_only_fields = ("id", "image")
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -43,10 +238,34 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
 
 
-class RecipeImgaeSerializer(serializers.ModelSerializer):
+class RecipeImgaeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading image"""
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
         read_only_fields = ("id",)
+
+    def update(self, instance, validated_data):
+        """Point at streamed uploads in place instead of copying them
+
+        The replaced image is deleted with its variants, those of the new
+        one are generated later.
+        """
+        replaced = (instance.image.name, instance.image_variants)
+        instance.image_variants = ""
+        image = validated_data.get("image")
+        stored_name = getattr(image, "stored_name", None)
+
+        if stored_name is None:
+            instance = super().update(instance, validated_data)
+        else:
+            instance.image.name = stored_name
+            instance.save(update_fields=["image", "image_variants", "updated_at"])
+
+        if replaced[0] and replaced[0] != instance.image.name:
+            images.delete_image(*replaced)
+
+        return instance
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache, search
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner_cache(sender, instance, **kwargs):
+    """Invalidate cached responses of the owner of a changed object"""
+    cache.bump_version_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_relation_cache(sender, instance, action, **kwargs):
+    """Invalidate cached responses when recipe tags/ingredients change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        cache.bump_version_on_commit(instance.user_id)
+
+
+def touch_recipes(recipes):
+    """Mark recipes as modified so conditional GETs see the change"""
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_relation_recipes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Touch recipes whose tags/ingredients were added, removed or cleared"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action in ("post_add", "post_remove"):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action == "pre_clear":
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_attr_recipes(sender, instance, created=False, **kwargs):
+    """Touch recipes nesting a tag/ingredient that was renamed or deleted"""
+    if not created:
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """Index the (possibly changed) title of a saved recipe"""
+    search.update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_relation_search_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex recipes whose tags/ingredients were added, removed or cleared"""
+    if not search.supports_full_text():
+        return
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            search.update_search_vectors([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        search.update_search_vectors(pk_set)
+    elif action == "pre_clear":
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        search.update_search_vectors(instance.__dict__.pop("_search_recipe_ids", []))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def update_attr_search_vectors(sender, instance, signal, created=False, **kwargs):
+    """Reindex recipes using a tag/ingredient that was renamed or deleted"""
+    if not search.supports_full_text():
+        return
+
+    if signal is pre_delete:
+        # the relation rows are gone once the object is deleted
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list("pk", flat=True)
+        )
+    elif signal is post_delete:
+        search.update_search_vectors(instance.__dict__.pop("_search_recipe_ids", []))
+    elif not created:
+        search.update_search_vectors(instance.recipe_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_user_cache(sender, instance, created, **kwargs):
+    """Make sure a new user never sees responses cached under a reused id"""
+    if created:
+        cache.reset_version(instance.pk)
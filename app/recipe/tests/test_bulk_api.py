@@ -0,0 +1,204 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_BULK_URL = reverse("recipe:recipe-bulk")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test the batch recipe endpoints"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [Tag.objects.create(user=self.user, name=f"t{i}") for i in range(3)]
+        self.ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+
+    def payload(self, count):
+        return [
+            {
+                "title": f"Recipe {i}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [tag.id for tag in self.tags],
+                "ingredients": [self.ingredient.id],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test creating a batch of recipes with their relations"""
+        res = self.client.post(RECIPES_BULK_URL, self.payload(3), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+        for item in res.data:
+            recipe = Recipe.objects.get(id=item["id"])
+            self.assertEqual(
+                sorted(recipe.tags.values_list("id", flat=True)),
+                sorted(tag.id for tag in self.tags),
+            )
+            self.assertEqual(item["tags"], [tag.id for tag in self.tags])
+            self.assertEqual(item["ingredients"], [self.ingredient.id])
+
+    def test_bulk_create_queries_constant(self):
+        """Test the number of queries doesn't grow with the batch size"""
+        counts = []
+
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    RECIPES_BULK_URL, self.payload(size), format="json"
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        if connection.features.can_return_ids_from_bulk_insert:
+            self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_create_invalid_item(self):
+        """Test an invalid item rejects the whole batch with per item errors"""
+        payload = self.payload(2)
+        payload[1]["tags"] = [999999]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("tags", res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """Test the batch must be a list"""
+        res = self.client.post(RECIPES_BULK_URL, {"title": "x"}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating a batch of recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe1.tags.add(self.tags[0])
+        self.client.get(RECIPES_URL)
+
+        payload = [
+            {"id": recipe1.id, "title": "New 1", "tags": [self.tags[1].id]},
+            {"id": recipe2.id, "price": "7.50"},
+        ]
+        res = self.client.patch(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, "New 1")
+        self.assertEqual(list(recipe1.tags.all()), [self.tags[1]])
+        self.assertEqual(str(recipe2.price), "7.50")
+
+        titles = [r["title"] for r in self.client.get(RECIPES_URL).json()["results"]]
+        self.assertIn("New 1", titles)
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test recipes of other users can't be updated"""
+        recipe = sample_recipe(user=sample_user("other@gmail.com", "otherpass"))
+
+        res = self.client.patch(
+            RECIPES_BULK_URL, [{"id": recipe.id, "title": "x"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0])
+
+    def test_bulk_invalid_ids(self):
+        """Test ids that aren't primary keys are reported per item"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.patch(
+            RECIPES_BULK_URL,
+            [{"id": [recipe.id]}, {"id": True}, {"id": str(recipe.id), "title": "x"}],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in res.data], [True, True, False])
+        self.assertIn("id", res.data[0])
+
+        res = self.client.delete(RECIPES_BULK_URL, [{"id": recipe.id}], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_numeric_strings(self):
+        """Test ids can be given as numeric strings like anywhere else"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(RECIPES_BULK_URL, [str(recipe.id)], format="json")
+
+        self.assertEqual(
+            res.data, [{"id": recipe.id, "status": status.HTTP_204_NO_CONTENT}]
+        )
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting a batch of recipes reports each id"""
+        recipe = sample_recipe(user=self.user)
+        other = sample_recipe(user=sample_user("other@gmail.com", "otherpass"))
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id, other.id], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {"id": recipe.id, "status": status.HTTP_204_NO_CONTENT},
+                {"id": other.id, "status": status.HTTP_404_NOT_FOUND},
+            ],
+        )
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+
+class BulkTagApiTests(TestCase):
+    """Test the batch tag endpoints"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating a batch of tags for the user"""
+        res = self.client.post(
+            TAGS_BULK_URL, [{"name": "Vegan"}, {"name": "Dessert"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user).values_list("name", flat=True)),
+            ["Dessert", "Vegan"],
+        )
@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from recipe import cache
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test the per-user response cache"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test that an unchanged listing doesn't hit the database"""
+        sample_recipe(user=self.user)
+        res1 = self.client.get(RECIPES_URL)
+
+        # only the conditional GET marker is read from the database
+        with self.assertNumQueries(1):
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.content, res2.content)
+
+    def test_recipe_save_invalidates_cache(self):
+        """Test that saving a recipe invalidates the owner's listings"""
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        recipe.title = "Changed"
+        recipe.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.json()["results"][0]["title"], "Changed")
+
+    def test_recipe_tags_change_invalidates_cache(self):
+        """Test that adding a tag to a recipe invalidates the listings"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(RECIPES_URL)
+        self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.json()["results"][0]["tags"], [tag.id])
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        self.assertEqual(res.json()["results"][0]["id"], tag.id)
+
+    def test_write_invalidates_cache_on_commit(self):
+        """Test lists cached before a write commits aren't served after it"""
+        sample_recipe(user=self.user)
+
+        with patch("recipe.cache.transaction.on_commit") as on_commit:
+            recipe = sample_recipe(user=self.user, title="Uncommitted")
+
+        # a list read concurrently, before the write is committed
+        with patch("recipe.views.RecipeViewSet.get_queryset") as get_queryset:
+            get_queryset.return_value = Recipe.objects.exclude(pk=recipe.pk)
+            self.client.get(RECIPES_URL)
+
+        for call in on_commit.call_args_list:
+            call[0][0]()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn(recipe.id, [r["id"] for r in res.json()["results"]])
+
+    def test_cache_limited_to_user(self):
+        """Test that cached responses aren't shared between users"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        user2 = sample_user("other@gmail.com", "otherpass")
+        self.client.force_authenticate(user2)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.json()["results"], [])
+
+    def test_other_user_write_keeps_cache(self):
+        """Test that another user's writes don't invalidate the cache"""
+        user2 = sample_user("other@gmail.com", "otherpass")
+        self.client.get(RECIPES_URL)
+        version = cache.get_version(self.user.pk)
+
+        sample_recipe(user=user2)
+
+        self.assertEqual(cache.get_version(self.user.pk), version)
+
+    def test_query_params_normalized(self):
+        """Test that reordered filter ids share a cache entry"""
+        tag1 = Tag.objects.create(user=self.user, name="tag1")
+        tag2 = Tag.objects.create(user=self.user, name="tag2")
+        self.client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, {"tags": f"{tag2.id},{tag1.id}"})
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
+
+
+def detail_url(recipe_id):
+    """return recipe detail url"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag / Last-Modified handling of the recipe API"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        """Test listing with a current ETag returns 304 in one query"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_list_modified_after_delete(self):
+        """Test deleting a recipe changes the list ETag"""
+        sample_recipe(user=self.user)
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        recipe.delete()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_detail_not_modified(self):
+        """Test recipe detail with a current ETag returns 304"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_tag_rename(self):
+        """Test renaming a nested tag changes the recipe detail ETag"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe.tags.add(tag)
+        etag = self.client.get(detail_url(recipe.id))["ETag"]
+
+        tag.name = "Vegetarian"
+        tag.save()
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tags"][0]["name"], "Vegetarian")
+
+    def test_detail_modified_by_bulk_tag_changes(self):
+        """Test batch renames and deletes of tags change the detail ETag"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe.tags.add(tag)
+
+        for method, payload in (
+            ("patch", [{"id": tag.id, "name": "Vegetarian"}]),
+            ("delete", [tag.id]),
+        ):
+            etag = self.client.get(detail_url(recipe.id))["ETag"]
+            getattr(self.client, method)(TAGS_BULK_URL, payload, format="json")
+
+            res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(res.data["tags"], [])
+
+    def test_detail_of_other_user_not_found(self):
+        """Test the conditional check doesn't leak other users' recipes"""
+        recipe = sample_recipe(user=sample_user("other@gmail.com", "otherpass"))
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", res)
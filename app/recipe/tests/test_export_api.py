@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicExportApiTests(TestCase):
+    """Test the export needs authentication"""
+
+    def test_auth_required(self):
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExportApiTests(TestCase):
+    """Test streaming the recipes of a user"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.salt = Ingredient.objects.create(user=self.user, name="Salt")
+
+        self.recipe = sample_recipe(self.user, title="Curry", link="https://x.io")
+        self.recipe.tags.add(self.vegan)
+        self.recipe.ingredients.add(self.salt)
+        self.plain = sample_recipe(self.user, title="Toast", price=1.50)
+        sample_recipe(sample_user("other@gmail.com"), title="Not mine")
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_ndjson(self):
+        """Test recipes are exported one JSON object per line"""
+        res, content = self.export()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="recipes.ndjson"', res["Content-Disposition"])
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [
+                {
+                    "id": self.plain.id,
+                    "title": "Toast",
+                    "time_minutes": 10,
+                    "price": "1.50",
+                    "link": "",
+                    "tags": [],
+                    "ingredients": [],
+                },
+                {
+                    "id": self.recipe.id,
+                    "title": "Curry",
+                    "time_minutes": 10,
+                    "price": "5.00",
+                    "link": "https://x.io",
+                    "tags": ["Vegan"],
+                    "ingredients": ["Salt"],
+                },
+            ],
+        )
+
+    def test_csv(self):
+        """Test recipes are exported as CSV with names as JSON arrays"""
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Dinner"))
+
+        res, content = self.export(type="csv")
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(
+            rows,
+            [
+                ["id", "title", "time_minutes", "price", "link", "tags", "ingredients"],
+                [str(self.plain.id), "Toast", "10", "1.50", "", "[]", "[]"],
+                [
+                    str(self.recipe.id),
+                    "Curry",
+                    "10",
+                    "5.00",
+                    "https://x.io",
+                    '["Vegan", "Dinner"]',
+                    '["Salt"]',
+                ],
+            ],
+        )
+
+    def test_filters(self):
+        """Test the list filters apply to the export"""
+        res, content = self.export(tags=str(self.vegan.id))
+
+        self.assertEqual(
+            [json.loads(line)["id"] for line in content.splitlines()],
+            [self.recipe.id],
+        )
+
+    def test_unknown_type(self):
+        """Test unknown export types are rejected"""
+        res = self.client.get(EXPORT_URL, {"type": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_names_fetched_per_chunk(self):
+        """Test related names take one query per relation and chunk"""
+        for i in range(3):
+            sample_recipe(self.user, title=f"Extra {i}").tags.add(self.vegan)
+
+        res = self.client.get(EXPORT_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            lines = b"".join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        # the rows, and tags and ingredients for each of the 3 chunks
+        self.assertEqual(len(queries), 1 + 3 * 2)
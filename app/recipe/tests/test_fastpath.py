@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import cache
+from recipe.fastpath import ListPlan
+from recipe.serializers import RecipeSerializer, RecipeImgaeSerializer
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+class FastListParityTests(TestCase):
+    """Test the fast list path renders exactly what the serializers do"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=f"Tag {i}") for i in range(4)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"Ingredient {i}")
+            for i in range(3)
+        ]
+
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {i}  ",
+                time_minutes=10 * i,
+                price=f"{i}.5",
+                link="" if i % 2 else f"https://example.com/{i}",
+            )
+            # added out of id order on purpose
+            recipe.tags.add(*reversed(tags[i % 3 :]))
+            recipe.ingredients.add(*ingredients[: i % 4])
+
+        recipe.image.name = "uploads/recipe/sample.jpg"
+        recipe.save()
+
+    def assertSameContent(self, url, params=None):
+        """Assert the fast and the serializer path render identical bytes"""
+        fast = self.client.get(url, params)
+        cache.bump_version(self.user.pk)
+
+        with override_settings(FAST_LIST=False):
+            slow = self.client.get(url, params)
+        cache.bump_version(self.user.pk)
+
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_recipe_list(self):
+        """Test the default recipe list"""
+        self.assertSameContent(RECIPES_URL)
+
+    def test_recipe_list_pages(self):
+        """Test cursor pages and the unpaginated list"""
+        self.assertSameContent(RECIPES_URL, {"page_size": 2})
+        self.assertSameContent(RECIPES_URL, {"paginate": 0})
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+        self.assertSameContent(res.data["next"])
+
+    def test_recipe_list_representations(self):
+        """Test sparse fields and expanded relations"""
+        self.assertSameContent(RECIPES_URL, {"fields": "id,title,image"})
+        self.assertSameContent(RECIPES_URL, {"fields": "image_variants,price"})
+        self.assertSameContent(RECIPES_URL, {"expand": "tags,ingredients"})
+        self.assertSameContent(RECIPES_URL, {"fields": "tags", "expand": "tags"})
+
+    def test_recipe_list_filters(self):
+        """Test filtered, searched and ranged lists"""
+        tag = Tag.objects.filter(user=self.user).first()
+        self.assertSameContent(RECIPES_URL, {"tags": tag.id})
+        self.assertSameContent(RECIPES_URL, {"search": "recipe", "page_size": 2})
+        self.assertSameContent(RECIPES_URL, {"max_price": "3", "min_time": 10})
+
+    def test_tag_and_ingredient_lists(self):
+        """Test the tag and ingredient lists"""
+        self.assertSameContent(TAGS_URL)
+        self.assertSameContent(TAGS_URL, {"assigned_only": 1, "page_size": 2})
+        self.assertSameContent(INGREDIENTS_URL, {"paginate": 0})
+
+
+class ListPlanTests(TestCase):
+    """Test which serializers the fast list path handles"""
+
+    def test_recipe_serializers_planned(self):
+        """Test plain, sparse and expanded recipe serializers are planned"""
+        self.assertIsNotNone(ListPlan.build(RecipeSerializer()))
+        self.assertIsNotNone(ListPlan.build(RecipeSerializer(fields=["id", "tags"])))
+        self.assertIsNotNone(ListPlan.build(RecipeSerializer(expand=["ingredients"])))
+        self.assertIsNotNone(ListPlan.build(RecipeImgaeSerializer()))
@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import importer
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def recipe_rows(count, start=0):
+    return [
+        {
+            "title": f"Recipe {i}",
+            "time_minutes": i,
+            "price": "5.00",
+            "tags": ["Vegan", f"Tag {i % 2}"],
+            "ingredients": ["Salt"],
+        }
+        for i in range(start, start + count)
+    ]
+
+
+class ImportTestMixin:
+    def setUp(self):
+        self.user = sample_user()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+
+        with open(path, "w") as f:
+            f.write(content)
+
+        return path
+
+    def write_ndjson(self, rows, name="recipes.ndjson"):
+        return self.write(name, "".join(json.dumps(row) + "\n" for row in rows))
+
+    def import_recipes(self, path, *args):
+        out = StringIO()
+        call_command(
+            "import_recipes", path, "--user", self.user.email, *args, stdout=out
+        )
+
+        return out.getvalue()
+
+
+class ImportRecipesTests(ImportTestMixin, TestCase):
+    """Test importing recipes in batches"""
+
+    def test_import_ndjson(self):
+        """Test recipes are imported with their tags and ingredients"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        path = self.write_ndjson(recipe_rows(5))
+
+        out = self.import_recipes(path, "--batch-size=2")
+
+        self.assertIn("Imported 5 recipes", out)
+        self.assertIn("rows/s", out)
+        recipe = Recipe.objects.get(title="Recipe 3")
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(recipe.time_minutes, 3)
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)), ["Tag 1", "Vegan"]
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list("name", flat=True)), ["Salt"]
+        )
+        # existing names are reused, new ones created once
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_export_round_trip(self):
+        """Test the files of the export can be imported"""
+        other = sample_user("other@gmail.com")
+        client = APIClient()
+        client.force_authenticate(other)
+        curry = Recipe.objects.create(
+            user=other, title="Curry", time_minutes=30, price="7.50"
+        )
+        curry.tags.add(Tag.objects.create(user=other, name="Dinner"))
+        curry.ingredients.add(
+            Ingredient.objects.create(user=other, name='Salt; pepper, "ground"')
+        )
+        Recipe.objects.create(user=other, title="Toast", time_minutes=5, price="1.00")
+
+        for export_type in ("ndjson", "csv"):
+            res = client.get(EXPORT_URL, {"type": export_type})
+            content = b"".join(res.streaming_content).decode()
+            path = self.write(f"export.{export_type}", content)
+            self.import_recipes(path)
+
+        imported = Recipe.objects.filter(user=self.user, title="Curry")
+        self.assertEqual(imported.count(), 2)
+        self.assertEqual(
+            set(imported.values_list("price", "tags__name")),
+            {(Decimal("7.50"), "Dinner")},
+        )
+        self.assertEqual(
+            set(imported.values_list("ingredients__name", flat=True)),
+            {'Salt; pepper, "ground"'},
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+
+    def test_invalid_row(self):
+        """Test an invalid row stops the import after the committed batches"""
+        rows = recipe_rows(4)
+        rows[3]["time_minutes"] = "soon"
+        path = self.write_ndjson(rows)
+
+        with self.assertRaisesMessage(CommandError, "Row 4"):
+            self.import_recipes(path, "--batch-size=2")
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(importer.load_checkpoint(f"{path}.checkpoint"), 2)
+
+    def test_resume(self):
+        """Test resuming skips the rows recorded in the checkpoint"""
+        path = self.write_ndjson(recipe_rows(5))
+        importer.save_checkpoint(f"{path}.checkpoint", 3)
+
+        self.import_recipes(path, "--resume")
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Recipe 3", "Recipe 4"],
+        )
+
+    def test_resume_with_workers(self):
+        """Test parallel imports, committed out of order, can't be resumed"""
+        path = self.write_ndjson(recipe_rows(5))
+        importer.save_checkpoint(f"{path}.checkpoint", 3)
+
+        with self.assertRaisesMessage(CommandError, "can't be resumed"):
+            self.import_recipes(path, "--resume", "--workers=2")
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_csv_names(self):
+        """Test name lists that aren't JSON stop the import"""
+        path = self.write("recipes.csv", "title,time_minutes,price,tags\nPie,5,1,a;b\n")
+
+        with self.assertRaisesMessage(CommandError, "Row 1: tags"):
+            self.import_recipes(path)
+
+    def test_unknown_user(self):
+        path = self.write_ndjson(recipe_rows(1))
+
+        with self.assertRaises(CommandError):
+            call_command("import_recipes", path, "--user", "nobody@gmail.com")
+
+    def test_unknown_format(self):
+        path = self.write("recipes.txt", "")
+
+        with self.assertRaises(CommandError):
+            self.import_recipes(path)
+
+    def test_clean_row(self):
+        """Test rows are converted and checked like model fields"""
+        fields, related = importer.clean_row(
+            {"title": "Pie", "time_minutes": "10", "price": "2.5", "tags": ["a", "a"]},
+            1,
+        )
+
+        self.assertEqual(fields["time_minutes"], 10)
+        self.assertEqual(related, {"tags": ["a"], "ingredients": []})
+
+        with self.assertRaises(importer.InvalidRow):
+            importer.clean_row({"title": "Pie", "time_minutes": 1}, 1)
+        with self.assertRaises(importer.InvalidRow):
+            importer.clean_row(
+                {"title": "Pie", "time_minutes": 1, "price": 1, "tags": "a"}, 1
+            )
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "worker processes need a shared database"
+)
+class ParallelImportTests(ImportTestMixin, TransactionTestCase):
+    """Test importing recipes with several processes"""
+
+    def test_workers(self):
+        path = self.write_ndjson(recipe_rows(10))
+
+        out = self.import_recipes(path, "--batch-size=2", "--workers=2")
+
+        self.assertIn("Imported 10 recipes", out)
+        self.assertEqual(Recipe.objects.filter(tags__name="Vegan").count(), 10)
+        self.assertEqual(Tag.objects.count(), 3)
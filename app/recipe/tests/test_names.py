@@ -0,0 +1,245 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection, migrations
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache, names
+
+RECIPES_URL = reverse("recipe:recipe-list")
+RECIPES_BULK_URL = reverse("recipe:recipe-bulk")
+TAGS_URL = reverse("recipe:tag-list")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
+
+unique_names = importlib.import_module("core.migrations.0014_unique_names")
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class RelatedNamesTests(TestCase):
+    """Test recipes can be given tags and ingredients by name"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+
+    def payload(self, **params):
+        defaults = {
+            "title": "Curry",
+            "time_minutes": 30,
+            "price": "7.50",
+            "tags": [],
+            "ingredients": [],
+        }
+        defaults.update(params)
+
+        return defaults
+
+    def test_create_with_names(self):
+        """Test names are matched whatever their case or created"""
+        payload = self.payload(
+            tags=["vegan", "Dinner", self.vegan.id], ingredients=["Salt", "salt"]
+        )
+
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)), ["Dinner", "Vegan"]
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list("name", flat=True)), ["Salt"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_numeric_names(self):
+        """Test numeric strings are ids, unless given as a name object"""
+        payload = self.payload(tags=[str(self.vegan.id), {"name": "2024"}])
+
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)), ["2024", "Vegan"]
+        )
+
+    def test_invalid_names(self):
+        """Test blank and too long names are rejected"""
+        for name in (" ", "x" * 256):
+            res = self.client.post(
+                RECIPES_URL, self.payload(tags=[name]), format="json"
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("tags", res.data)
+
+        self.assertEqual(Recipe.objects.count(), 0)
+
+    def test_update_with_names(self):
+        """Test the names of an update are resolved for the recipe's owner"""
+        recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price="7.50"
+        )
+
+        res = self.client.patch(
+            detail_url(recipe.id), {"tags": ["VEGAN", "Spicy"]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)), ["Spicy", "Vegan"]
+        )
+
+    def test_bulk_create_with_names(self):
+        """Test the names of a batch are resolved with one get-or-create"""
+        payload = [
+            self.payload(title=f"Recipe {i}", tags=["Vegan", f"Tag {i}"])
+            for i in range(10)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 11)
+        tag_queries = [q for q in queries if 'INTO "core_tag"' in q["sql"]]
+        self.assertEqual(len(tag_queries), 1)
+
+    def test_get_or_create(self):
+        """Test existing names are found and missing ones created once"""
+        objects = names.get_or_create(Tag, self.user.pk, ["VEGAN", "Dinner", "dinner"])
+
+        self.assertEqual(objects["VEGAN"], self.vegan)
+        self.assertEqual(objects["Dinner"].name, "Dinner")
+        self.assertEqual(objects["dinner"], objects["Dinner"])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_non_ascii_names(self):
+        """Test names are matched like the database lowercases them"""
+        for tags in (["Éclair"], ["Éclair", "éclair"], ["ÉCLAIR"]):
+            res = self.client.post(RECIPES_URL, self.payload(tags=tags), format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertTrue(Tag.objects.filter(user=self.user, name="Éclair").exists())
+
+
+class UniqueNamesTests(TestCase):
+    """Test users can't have a tag or ingredient name twice"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_duplicate_name(self):
+        """Test names differing only by case are rejected"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=sample_user("other@gmail.com"), name="Dinner")
+
+        res = self.client.post(TAGS_URL, {"name": "vegan"})
+        other = self.client.post(TAGS_URL, {"name": "Dinner"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+
+    def test_duplicate_names_in_batch(self):
+        """Test a batch can't create a name the user has or twice"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{"name": "VEGAN"}, {"name": "Dinner"}, {"name": "dinner"}],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in res.data], [True, False, True])
+
+    def test_name_taken_during_batch(self):
+        """Test names taken since a batch was validated are rejected, not a 500"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        keys = names.name_keys(["Dinner", "vegan"]).values()
+        # free when validating, as if created by a concurrent request since
+        taken = [{}, names.taken(Tag, self.user.pk, keys)]
+
+        with mock.patch("recipe.names.taken", side_effect=taken):
+            res = self.client.post(
+                TAGS_BULK_URL, [{"name": "Dinner"}, {"name": "vegan"}], format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[1]["name"][0].code, "name_taken")
+        self.assertFalse(Tag.objects.filter(name="Dinner").exists())
+
+    def test_rename_keeps_name(self):
+        """Test a tag can be updated with its own name"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.patch(
+            TAGS_BULK_URL, [{"id": tag.id, "name": "vegan"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_merge_duplicates(self):
+        """Test the migration merges duplicates into the oldest object"""
+        with connection.cursor() as cursor:
+            for index in unique_names.UNIQUE_INDEXES.values():
+                cursor.execute(f"DROP INDEX {index}")
+
+        kept = Ingredient.objects.create(user=self.user, name="Salt")
+        duplicate = Ingredient.objects.create(user=self.user, name="salt")
+        other = Ingredient.objects.create(user=sample_user("o@gmail.com"), name="salt")
+        both = Recipe.objects.create(
+            user=self.user, title="Both", time_minutes=1, price=1
+        )
+        both.ingredients.add(kept, duplicate)
+        moved = Recipe.objects.create(
+            user=self.user, title="Moved", time_minutes=1, price=1
+        )
+        moved.ingredients.add(duplicate)
+        untouched = Recipe.objects.create(
+            user=self.user, title="Kept", time_minutes=1, price=1
+        )
+        untouched.ingredients.add(kept)
+        version = cache.get_version(self.user.pk)
+
+        with connection.schema_editor() as editor:
+            unique_names.merge_duplicates(apps, editor)
+            unique_names.check_constraints(apps, editor)
+
+            # the indexes are built in the transaction that deleted rows
+            for operation in unique_names.Migration.operations:
+                if isinstance(operation, migrations.RunSQL):
+                    editor.execute(operation.sql)
+
+        self.assertFalse(Ingredient.objects.filter(pk=duplicate.pk).exists())
+        self.assertTrue(Ingredient.objects.filter(pk=other.pk).exists())
+        self.assertEqual(list(both.ingredients.all()), [kept])
+        self.assertEqual(list(moved.ingredients.all()), [kept])
+
+        for recipe in (both, moved, untouched):
+            recipe.refresh_from_db()
+        self.assertGreater(both.updated_at, untouched.updated_at)
+        self.assertGreater(moved.updated_at, untouched.updated_at)
+        self.assertNotEqual(cache.get_version(self.user.pk), version)
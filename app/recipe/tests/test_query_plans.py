@@ -0,0 +1,148 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection
+from django.db.models import Index
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Recipe
+from recipe.views import TagViewSet, RecipeViewSet
+
+ROWS_USERS = 10
+ROWS_PER_USER = 500
+
+
+def sample_user(email="test@gmail.com", password="testpass"):
+    return get_user_model().objects.create_user(email, password)
+
+
+def view_queryset(viewset_class, user, **params):
+    """Return the list queryset a viewset builds for the given query params"""
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = viewset_class(action="list", request=request, format_kwarg=None)
+
+    return view.get_queryset()
+
+
+class QueryPlanTests(TestCase):
+    """Test the list filters are served from the composite indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # the planner only prefers reading a user's rows in index order to
+        # sorting them once the tables hold enough analyzed rows
+        users = [sample_user(f"user{i}@gmail.com") for i in range(ROWS_USERS)]
+        cls.user = users[0]
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f"Tag {i}")
+            for user in users
+            for i in range(ROWS_PER_USER)
+        )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f"Recipe {i}", time_minutes=i % 240, price=i % 100)
+            for user in users
+            for i in range(ROWS_PER_USER)
+        )
+        cls.tag = Tag.objects.filter(user=cls.user).first()
+        cls.tag.recipe_set.add(*Recipe.objects.filter(user=cls.user)[:10])
+
+        with connection.cursor() as cursor:
+            for model in (Tag, Recipe, Recipe.tags.through):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def assertHasIndex(self, model, index_name, columns, index_class=Index):
+        """Assert the index exists without depending on the plan chosen
+
+        Whether the planner reads a range or search filter through its index
+        depends on the table statistics and cost ties.
+        """
+        table = model._meta.db_table
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+
+        self.assertIn(index_name, constraints)
+        self.assertEqual(constraints[index_name]["columns"], columns)
+        self.assertEqual(constraints[index_name]["type"], index_class.suffix)
+
+    def test_tag_list_uses_user_name_index(self):
+        """Test listing tags reads the (user, -name, id) index"""
+        queryset = view_queryset(TagViewSet, self.user)
+
+        self.assertUsesIndex(queryset[:50], "core_tag_user_name_idx")
+
+    def test_assigned_tags_use_user_name_index(self):
+        """Test assigned_only doesn't need DISTINCT and keeps the index"""
+        queryset = view_queryset(TagViewSet, self.user, assigned_only=1)
+
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        self.assertIn("EXISTS", str(queryset.query))
+        self.assertUsesIndex(queryset[:50], "core_tag_user_name_idx")
+
+    def test_recipe_list_uses_user_id_index(self):
+        """Test listing recipes reads the (user, id) index"""
+        queryset = view_queryset(RecipeViewSet, self.user)
+
+        self.assertUsesIndex(queryset[:50], "core_recipe_user_id_idx")
+
+    def test_recipe_tag_filter_uses_exists(self):
+        """Test filtering recipes by tags uses EXISTS instead of a join"""
+        queryset = view_queryset(RecipeViewSet, self.user, tags=str(self.tag.id))
+
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        self.assertIn("EXISTS", str(queryset.query))
+        self.assertUsesIndex(queryset[:50], "core_recipe_user_id_idx")
+
+    def test_recipe_time_range_uses_user_time_index(self):
+        """Test time range filters match the (user, time_minutes) index"""
+        queryset = view_queryset(RecipeViewSet, self.user, min_time=1, max_time=30)
+        where = str(queryset.query).split(" WHERE ")[1]
+
+        self.assertIn('"core_recipe"."user_id" =', where)
+        self.assertIn('"core_recipe"."time_minutes" >=', where)
+        self.assertIn('"core_recipe"."time_minutes" <=', where)
+        self.assertHasIndex(
+            Recipe, "core_recipe_user_time_idx", ["user_id", "time_minutes"]
+        )
+
+    def test_recipe_price_range_uses_user_price_index(self):
+        """Test price range filters match the (user, price) index"""
+        queryset = view_queryset(RecipeViewSet, self.user, max_price="9.99")
+        where = str(queryset.query).split(" WHERE ")[1]
+
+        self.assertIn('"core_recipe"."user_id" =', where)
+        self.assertIn('"core_recipe"."price" <=', where)
+        self.assertHasIndex(Recipe, "core_recipe_user_price_idx", ["user_id", "price"])
+
+    @skipUnless(connection.vendor == "postgresql", "GIN indexes need PostgreSQL")
+    def test_recipe_search_uses_search_index(self):
+        """Test searching recipes matches the GIN index of the search vector"""
+        queryset = view_queryset(RecipeViewSet, self.user, search="soup")
+        where = str(queryset.query).split(" WHERE ")[1]
+
+        self.assertIn('"core_recipe"."search_vector" @@', where)
+        self.assertHasIndex(
+            Recipe, "core_recipe_search_idx", ["search_vector"], GinIndex
+        )
+
+    def test_recipe_match_all_uses_one_grouped_subquery(self):
+        """Test match=all uses HAVING COUNT instead of a join per id"""
+        tags = [Tag.objects.create(user=self.user, name=f"t{i}") for i in range(10)]
+        queryset = view_queryset(
+            RecipeViewSet,
+            self.user,
+            tags=",".join(str(tag.id) for tag in tags),
+            match="all",
+        )
+        sql = str(queryset.query)
+
+        self.assertIn("HAVING COUNT", sql)
+        self.assertEqual(sql.count("JOIN"), 0)
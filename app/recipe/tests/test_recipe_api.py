@@ -1,11 +1,22 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -17,6 +28,11 @@ def detail_url(recipe_id):
     return reverse("recipe:recipe-detail", args=[recipe_id])
 
 
+def image_upload_url(recipe_id):
+    """return url for uploading a recipe image"""
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
 def sample_tag(user, name="Some name"):
     """Create and return a sample tag"""
     return Tag.objects.create(user=user, name=name)
@@ -76,7 +92,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test recipers are limited to authenticated users"""
@@ -89,7 +105,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.get(RECIPES_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
     def test_view_recipe_detail(self):
         """Test recipe detail view"""
@@ -233,9 +249,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
 
     def test_filter_recipes_by_ingredient(self):
         """Test returning recipes with specific ingredient"""
@@ -257,6 +273,459 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_filter_recipes_any_without_duplicates(self):
+        """Test a recipe matching several filter ids is returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name="tag1")
+        tag2 = sample_tag(user=self.user, name="tag2")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+
+    def test_filter_recipes_matching_all(self):
+        """Test match=all returns recipes having every tag and ingredient"""
+        tags = [sample_tag(user=self.user, name=f"tag{i}") for i in range(12)]
+        salt = sample_ingredient(user=self.user, name="Salt")
+        recipe1 = sample_recipe(user=self.user, title="recipe1")
+        recipe2 = sample_recipe(user=self.user, title="recipe2")
+        recipe3 = sample_recipe(user=self.user, title="recipe3")
+        recipe1.tags.add(*tags)
+        recipe1.ingredients.add(salt)
+        recipe2.tags.add(*tags[:11])
+        recipe2.ingredients.add(salt)
+        recipe3.tags.add(*tags)
+
+        tag_ids = ",".join(str(tag.id) for tag in tags)
+        res = self.client.get(
+            RECIPES_URL,
+            {"tags": f"{tag_ids},{tags[0].id}", "ingredients": salt.id, "match": "all"},
+        )
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe1.id])
+
+    def test_filter_recipes_invalid_match(self):
+        """Test unknown match modes are rejected"""
+        res = self.client.get(RECIPES_URL, {"tags": "1", "match": "some"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_invalid_ids(self):
+        """Test malformed id lists are rejected"""
+        for value in ("abc", "1,", "1,,2", "-1", str(2**31)):
+            res = self.client.get(RECIPES_URL, {"tags": value})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("tags", res.data)
+
+        res = self.client.get(RECIPES_URL, {"ingredients": "1,salt"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ingredients", res.data)
+
+    def test_recipes_paginated_by_cursor(self):
+        """Test recipes are returned newest first in cursor pages"""
+        recipes = [sample_recipe(user=self.user, title=f"r{i}") for i in range(3)]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [recipes[2].id, recipes[1].id]
+        )
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipes[0].id])
+        self.assertIsNone(res.data["next"])
+
+    def test_recipes_unpaginated_fallback(self):
+        """Test the full recipe list is returned with paginate=0"""
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {"paginate": 0, "page_size": 1})
+
+        recipes = Recipe.objects.all().order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+
+class RecipeRepresentationTests(TestCase):
+    """Test sparse fieldsets and expanded relations"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.tag = sample_tag(user=self.user, name="Vegan")
+        self.recipe.tags.add(self.tag)
+
+    def test_list_sparse_fields(self):
+        """Test only the requested fields are rendered and selected"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {"fields": "id,title,image"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.recipe.id, "title": self.recipe.title, "image": None}],
+        )
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn("core_recipe_tags", sql)
+
+    def test_list_expand(self):
+        """Test expanded relations nest the full objects"""
+        res = self.client.get(RECIPES_URL, {"fields": "id,tags", "expand": "tags"})
+
+        self.assertEqual(
+            res.data["results"],
+            [{"id": self.recipe.id, "tags": [{"id": self.tag.id, "name": "Vegan"}]}],
+        )
+
+    def test_list_without_expand(self):
+        """Test relations are rendered as ids unless expanded"""
+        res = self.client.get(RECIPES_URL, {"fields": "tags"})
+
+        self.assertEqual(res.data["results"], [{"tags": [self.tag.id]}])
+
+    def test_retrieve_sparse_fields(self):
+        """Test the detail view keeps nesting requested relations"""
+        res = self.client.get(detail_url(self.recipe.id), {"fields": "title,tags"})
+
+        tags = [{"id": self.tag.id, "name": "Vegan"}]
+        self.assertEqual(res.data, {"title": self.recipe.title, "tags": tags})
+
+    def test_unknown_fields(self):
+        """Test unknown fields and relations are rejected"""
+        res = self.client.get(RECIPES_URL, {"fields": "id,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", str(res.data["fields"]))
+
+        res = self.client.get(RECIPES_URL, {"expand": "title"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test that the recipe API runs a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, size):
+        """Create `size` recipes each linked to `size` tags and ingredients"""
+        tags = [sample_tag(self.user, name=f"tag{i}") for i in range(size)]
+        ingredients = [
+            sample_ingredient(self.user, name=f"ingredient{i}") for i in range(size)
+        ]
+
+        recipes = [
+            sample_recipe(user=self.user, title=f"recipe{i}") for i in range(size)
+        ]
+
+        for recipe in recipes:
+            recipe.tags.set(tags)
+            recipe.ingredients.set(ingredients)
+
+        return recipes, tags, ingredients
+
+    def assertConstantQueries(self, request, sizes=(1, 10)):
+        """Assert `request` runs the same number of queries for every data size"""
+        counts = []
+
+        for size in sizes:
+            Recipe.objects.all().delete()
+            Tag.objects.all().delete()
+            Ingredient.objects.all().delete()
+            data = self.populate(size)
+
+            with CaptureQueriesContext(connection) as queries:
+                res = request(*data)
+
+            self.assertLess(res.status_code, 300)
+            counts.append(len(queries))
+
+        self.assertEqual(len(set(counts)), 1, f"query counts vary: {counts}")
+
+    def test_list_queries_constant(self):
+        """Test listing recipes doesn't run a query per recipe"""
+        self.assertConstantQueries(lambda *data: self.client.get(RECIPES_URL))
+
+    def test_list_expand_queries_constant(self):
+        """Test expanding relations doesn't run a query per recipe"""
+        self.assertConstantQueries(
+            lambda *data: self.client.get(RECIPES_URL, {"expand": "tags,ingredients"})
+        )
+
+    def test_retrieve_queries_constant(self):
+        """Test recipe detail doesn't run a query per tag or ingredient"""
+        self.assertConstantQueries(
+            lambda recipes, tags, ingredients: self.client.get(
+                detail_url(recipes[0].id)
+            )
+        )
+
+    def test_create_queries_constant(self):
+        """Test creating a recipe doesn't run a query per tag or ingredient"""
+
+        def request(recipes, tags, ingredients):
+            payload = {
+                "title": "Chocolate",
+                "time_minutes": 30,
+                "price": 5.00,
+                "tags": [tag.id for tag in tags],
+                "ingredients": [ingredient.id for ingredient in ingredients],
+            }
+            return self.client.post(RECIPES_URL, payload)
+
+        self.assertConstantQueries(request)
+
+    def test_update_queries_constant(self):
+        """Test updating a recipe doesn't run a query per tag or ingredient"""
+
+        def request(recipes, tags, ingredients):
+            payload = {
+                "title": "Chocolate",
+                "time_minutes": 30,
+                "price": 5.00,
+                "tags": [tag.id for tag in tags],
+                "ingredients": [ingredient.id for ingredient in ingredients],
+            }
+            return self.client.put(detail_url(recipes[0].id), payload)
+
+        self.assertConstantQueries(request)
+
+
+class RecipeImageUploadTests(TestCase):
+    """Test uploading recipe images and their resized variants"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload_sample_image(self, size=(1200, 900)):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", size).save(ntf, format="JPEG")
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id), {"image": ntf}, format="multipart"
+            )
+
+    @patch("recipe.images.schedule_derivatives")
+    def test_upload_image_to_recipe(self, schedule_derivatives):
+        """Test uploading an image and scheduling its variants"""
+        res = self.upload_sample_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("image", res.data)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        schedule_derivatives.assert_called_once_with(self.recipe.image.name)
+        # not generated yet
+        self.assertIsNone(res.data["image_variants"])
+
+    def test_upload_image_bad_request(self):
+        """Test uploading an invalid image"""
+        res = self.client.post(
+            image_upload_url(self.recipe.id), {"image": "notimage"}, format="multipart"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("recipe.images.schedule_derivatives")
+    def test_generate_derivatives(self, schedule_derivatives):
+        """Test every variant is stored resized to its bounding box"""
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+
+        images.generate_derivatives(self.recipe.image.name)
+
+        names = images.variant_names(self.recipe.image.name)
+        Image.init()
+        for variant, name in names.items():
+            (width, height), fmt, ext = images.VARIANTS[variant]
+            if fmt not in Image.SAVE:
+                continue
+
+            with default_storage.open(name) as f:
+                derivative = Image.open(f)
+                self.assertEqual(derivative.format, fmt)
+                self.assertLessEqual(derivative.width, width)
+                self.assertLessEqual(derivative.height, height)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(
+            res.data["image_variants"]["thumbnail"].endswith("_thumbnail.jpg")
+        )
+
+    @patch("recipe.images.schedule_derivatives")
+    def test_failed_variant_not_exposed(self, schedule_derivatives):
+        """Test only the variants stored successfully are listed"""
+        encode_variant = images.encode_variant
+
+        def encode(image, size, fmt):
+            if size == images.VARIANTS["medium"][0] and fmt == "JPEG":
+                raise OSError("disk full")
+            return encode_variant(image, size, fmt)
+
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+
+        with patch("recipe.images.encode_variant", side_effect=encode):
+            with self.assertLogs("recipe.images", level="ERROR"):
+                images.generate_derivatives(self.recipe.image.name)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertNotIn("medium", res.data["image_variants"])
+        self.assertIn("thumbnail", res.data["image_variants"])
+
+    @patch("recipe.images.schedule_derivatives")
+    @patch("recipe.images.transaction.on_commit", side_effect=lambda func: func())
+    def test_replaced_image_deleted(self, on_commit, schedule_derivatives):
+        """Test the replaced image and its variants are deleted"""
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+        old_name = self.recipe.image.name
+        images.generate_derivatives(old_name)
+
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertIsNone(res.data["image_variants"])
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, "uploads/recipe")),
+            [os.path.basename(self.recipe.image.name)],
+        )
+
+    @patch("recipe.images.schedule_derivatives")
+    def test_variants_of_replaced_image_discarded(self, schedule_derivatives):
+        """Test variants finished after the image was replaced are removed"""
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+        old_name = self.recipe.image.name
+        self.upload_sample_image()
+
+        images.generate_derivatives(old_name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, "")
+        for name in images.variant_names(old_name).values():
+            self.assertFalse(default_storage.exists(name))
+
+    def test_upload_written_once(self):
+        """Test the upload is streamed to its final location without copies"""
+        with patch("recipe.images.schedule_derivatives"):
+            self.upload_sample_image()
+
+        self.recipe.refresh_from_db()
+        stored = os.listdir(os.path.join(self.media_root, "uploads/recipe"))
+
+        self.assertEqual(stored, [os.path.basename(self.recipe.image.name)])
+
+    def test_upload_other_files_not_stored(self):
+        """Test only the kept image is stored, whatever else is uploaded"""
+        files = []
+
+        for name in ("image", "image", "junk1", "junk2"):
+            f = tempfile.NamedTemporaryFile(suffix=".jpg")
+            self.addCleanup(f.close)
+            Image.new("RGB", (10, 10)).save(f, format="JPEG")
+            f.seek(0)
+            files.append((name, f))
+
+        with patch("recipe.images.schedule_derivatives"):
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {
+                    "image": [f for name, f in files if name == "image"],
+                    "junk1": files[2][1],
+                    "junk2": files[3][1],
+                },
+                format="multipart",
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, "uploads/recipe")),
+            [os.path.basename(self.recipe.image.name)],
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_upload_image_too_large(self):
+        """Test oversized uploads are rejected and nothing is stored"""
+        res = self.upload_sample_image(size=(512, 512))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "uploads")))
+
+    def test_upload_not_an_image(self):
+        """Test uploads without an image signature are rejected"""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            ntf.write(b"<html>not an image</html>" * 10)
+            ntf.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {"image": ntf}, format="multipart"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "uploads")))
+
+    def test_rejected_upload_discards_stored_images(self):
+        """Test images stored before a rejected one of the request are removed"""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image:
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as not_image:
+                Image.new("RGB", (10, 10)).save(image, format="JPEG")
+                image.seek(0)
+                not_image.write(b"<html>not an image</html>" * 10)
+                not_image.seek(0)
+                res = self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": [image, not_image]},
+                    format="multipart",
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, "uploads/recipe")), []
+        )
+
+    def test_upload_corrupt_image_discarded(self):
+        """Test files with an image signature but broken data are removed"""
+        with tempfile.NamedTemporaryFile(suffix=".png") as ntf:
+            ntf.write(b"\x89PNG\r\n\x1a\n" + b"garbage" * 10)
+            ntf.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {"image": ntf}, format="multipart"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, "uploads/recipe")), []
+        )
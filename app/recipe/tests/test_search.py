@@ -0,0 +1,169 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import search
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def sample_recipe(user, **params):
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching and range filtering recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.curry = sample_recipe(
+            self.user, title="Chicken curry", time_minutes=25, price=8
+        )
+        self.stew = sample_recipe(
+            self.user, title="Beef stew", time_minutes=90, price=12
+        )
+        self.salad = sample_recipe(self.user, title="Salad", time_minutes=5, price=3)
+        self.stew.tags.add(Tag.objects.create(user=self.user, name="Winter"))
+        self.salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Chicken")
+        )
+
+    def search(self, **params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe["id"] for recipe in res.data["results"]]
+
+    def test_search_title_tags_and_ingredients(self):
+        """Test search matches titles, tag names and ingredient names"""
+        self.assertEqual(
+            set(self.search(search="chicken")), {self.curry.id, self.salad.id}
+        )
+        self.assertEqual(self.search(search="winter"), [self.stew.id])
+
+    def test_search_requires_every_term(self):
+        """Test every search term has to match"""
+        self.assertEqual(self.search(search="chicken curry"), [self.curry.id])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test title matches rank above ingredient matches"""
+        ids = self.search(search="chicken")
+
+        if search.supports_full_text():
+            self.assertEqual(ids, [self.curry.id, self.salad.id])
+
+    def test_search_is_paginated_by_page(self):
+        """Test search results are paginated by page number"""
+        res = self.client.get(RECIPES_URL, {"search": "chicken", "page_size": 1})
+
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIn("page=2", res.data["next"])
+
+    def test_search_other_users_recipes(self):
+        """Test search only returns the user's own recipes"""
+        other = get_user_model().objects.create_user("other@londonappdev.com", "pass")
+        sample_recipe(other, title="Chicken soup")
+
+        self.assertNotIn("Chicken soup", str(self.client.get(RECIPES_URL).data))
+        self.assertEqual(len(self.search(search="chicken")), 2)
+
+    def test_search_with_range_filters(self):
+        """Test search combines with time and price ranges"""
+        self.assertEqual(self.search(search="chicken", max_time=10), [self.salad.id])
+
+    def test_time_range(self):
+        """Test filtering recipes by preparation time"""
+        self.assertEqual(self.search(max_time=30), [self.salad.id, self.curry.id])
+        self.assertEqual(self.search(min_time=30), [self.stew.id])
+
+    def test_price_range(self):
+        """Test filtering recipes by price"""
+        self.assertEqual(self.search(min_price="4", max_price="10.50"), [self.curry.id])
+
+    def test_invalid_range(self):
+        """Test invalid range values are rejected"""
+        res = self.client.get(RECIPES_URL, {"max_price": "cheap"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("max_price", res.data)
+
+
+class SearchVectorTests(TestCase):
+    """Test the search vectors follow recipe changes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@londonappdev.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms):
+        res = self.client.get(RECIPES_URL, {"search": terms})
+
+        return [recipe["id"] for recipe in res.data["results"]]
+
+    def test_renamed_tag(self):
+        """Test recipes are found by the new name of a renamed tag"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Spicy")
+        recipe.tags.add(tag)
+
+        tag.name = "Mild"
+        tag.save()
+
+        self.assertEqual(self.search("mild"), [recipe.id])
+        self.assertEqual(self.search("spicy"), [])
+
+    def test_deleted_ingredient(self):
+        """Test recipes aren't found by a deleted ingredient"""
+        recipe = sample_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name="Garlic")
+        recipe.ingredients.add(ingredient)
+        self.assertEqual(self.search("garlic"), [recipe.id])
+
+        ingredient.delete()
+
+        self.assertEqual(self.search("garlic"), [])
+
+    def test_bulk_created(self):
+        """Test recipes created in bulk are searchable"""
+        tag = Tag.objects.create(user=self.user, name="Quick")
+        payload = [
+            {
+                "title": "Omelette",
+                "time_minutes": 5,
+                "price": "2.00",
+                "tags": [tag.id],
+                "ingredients": [],
+            }
+        ]
+        res = self.client.post(reverse("recipe:recipe-bulk"), payload, format="json")
+
+        self.assertEqual(self.search("quick omelette"), [res.data[0]["id"]])
+
+    def test_vector_column_not_selected(self):
+        """Test listing recipes doesn't load the search vector"""
+        sample_recipe(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        self.assertFalse([sql for sql in selects if "search_vector" in sql])
@@ -48,7 +48,7 @@ class PrivateTagApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, res.data)
+        self.assertEqual(serializer.data, res.data["results"])
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -61,8 +61,8 @@ class PrivateTagApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tags.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tags.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -97,8 +97,8 @@ class PrivateTagApiTests(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_distinct_tags_assigned_to_recipes(self):
         """Test filtering tags by those who assigned to recipes"""
@@ -118,4 +118,20 @@ class PrivateTagApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paged by name without gaps or repeats"""
+        tags = [Tag.objects.create(user=self.user, name=f"same {i}") for i in range(3)]
+        Tag.objects.create(user=self.user, name="zzz")
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+        names = [t["name"] for t in res.data["results"]]
+        ids = [t["id"] for t in res.data["results"]]
+
+        res = self.client.get(res.data["next"])
+        names += [t["name"] for t in res.data["results"]]
+        ids += [t["id"] for t in res.data["results"]]
+
+        self.assertEqual(names, ["zzz", "same 2", "same 1", "same 0"])
+        self.assertEqual(ids[1:], [tag.id for tag in reversed(tags)])
@@ -0,0 +1,201 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+
+from core.models import recipe_image_file_path
+
+# bytes needed to recognise every supported image signature
+HEADER_SIZE = 12
+
+# room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 2**10
+
+TOO_LARGE = "too_large"
+INVALID_FORMAT = "invalid_format"
+
+ERROR_MESSAGES = {
+    TOO_LARGE: _("Image exceeds the maximum upload size of {max_size} bytes."),
+    INVALID_FORMAT: _("Upload a valid JPEG, PNG, GIF or WebP image."),
+}
+
+ERROR_STATUS = {
+    TOO_LARGE: status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    INVALID_FORMAT: status.HTTP_400_BAD_REQUEST,
+}
+
+
+def detect_image_extension(header):
+    """Return the file extension of an image from its magic bytes, or None"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+
+    return None
+
+
+def supports_direct_upload():
+    """Return whether uploads can be written straight into the storage"""
+    try:
+        default_storage.path("")
+    except NotImplementedError:
+        return False
+
+    return True
+
+
+class StoredUploadedFile(UploadedFile):
+    """An upload which was already written to its final storage location"""
+
+    def __init__(self, stored_name, path, **kwargs):
+        super().__init__(open(path, "rb"), **kwargs)
+        self.stored_name = stored_name
+        self.path = path
+
+    def temporary_file_path(self):
+        """Let image validation open the stored file instead of copying it"""
+        return self.path
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Stream an image upload straight to its final storage location
+
+    The byte limit and the image signature are checked while chunks
+    arrive, so bad payloads are rejected before they are buffered. Files
+    of other fields are dropped without being stored.
+    """
+
+    field = "image"
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        self.error = None
+
+    @property
+    def error_message(self):
+        """Return the message explaining why the upload was rejected"""
+        return ERROR_MESSAGES[self.error].format(max_size=self.max_size)
+
+    @property
+    def error_status(self):
+        """Return the response status of the rejected upload"""
+        return ERROR_STATUS[self.error]
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            # don't read the body at all
+            self.error = TOO_LARGE
+            return QueryDict(encoding=encoding), MultiValueDict()
+
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.skipped = self.field_name != self.field
+        self.header = b""
+        self.stored_name = None
+        self.path = None
+        self.destination = None
+
+    def open_file(self):
+        """Create the final file once the image format is known"""
+        extension = detect_image_extension(self.header)
+
+        if extension is None:
+            return False
+
+        name = recipe_image_file_path(None, f"upload.{extension}")
+        self.stored_name = default_storage.get_available_name(name)
+        self.path = default_storage.path(self.stored_name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.destination = open(self.path, "wb")
+        self.destination.write(self.header)
+
+        return True
+
+    def discard(self):
+        """Remove whatever was written of the current file"""
+        if self.destination is not None:
+            self.destination.close()
+            os.remove(self.path)
+
+    def reject(self, error):
+        self.error = error
+        self.discard()
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.skipped:
+            return None
+
+        if start + len(raw_data) > self.max_size:
+            self.reject(TOO_LARGE)
+
+        if self.destination is None:
+            self.header += raw_data
+
+            if len(self.header) >= HEADER_SIZE and not self.open_file():
+                self.reject(INVALID_FORMAT)
+        else:
+            self.destination.write(raw_data)
+
+        # the file is handled, other handlers must not buffer it
+        return None
+
+    def file_complete(self, file_size):
+        if self.skipped:
+            return None
+
+        if self.destination is None and not self.open_file():
+            self.error = INVALID_FORMAT
+            return None
+
+        self.destination.close()
+
+        return StoredUploadedFile(
+            self.stored_name,
+            self.path,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+
+def get_rejected_upload(request):
+    """Return the handler which rejected a streamed image upload, if any"""
+    for handler in request.upload_handlers:
+        if getattr(handler, "error", None):
+            return handler
+
+    return None
+
+
+def discard_stored_files(request, keep=None):
+    """Delete the uploads written to storage by a request, but `keep`
+
+    Called when validation failed, or with the name of the image saved,
+    as every file of the field was stored.
+    """
+    for field, files in request.FILES.lists():
+        for upload in files:
+            if isinstance(upload, StoredUploadedFile):
+                upload.close()
+
+                if upload.stored_name != keep:
+                    default_storage.delete(upload.stored_name)
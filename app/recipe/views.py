@@ -1,18 +1,36 @@
+from django.db.models import Prefetch
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import filters, images, names, search, serializers, signals, uploads
+from recipe.bulk import BulkMixin
+from recipe.cache import CachedListMixin
+from recipe.conditional import ConditionalGetMixin
+from recipe.export import ExportMixin
+from recipe.fastpath import FastListMixin
+from recipe.pagination import (
+    AttrCursorPagination,
+    RecipeCursorPagination,
+    SearchPagination,
+)
 
 
 class BaseAttrViewSet(
-    viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin
+    BulkMixin,
+    CachedListMixin,
+    FastListMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
 ):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = AttrCursorPagination
 
     def get_queryset(self):
         """Return objects fir the current authenticated user only"""
@@ -22,29 +40,61 @@ class BaseAttrViewSet(
         """we might not pass assigned_only get parameter, thats why we are using try catch to get rid of typeError"""
         try:
             assigned_only = bool(int(self.request.query_params.get("assigned_only")))
+        except (TypeError, ValueError):
+            assigned_only = None
 
-            if assigned_only:
-                # filter those tags/ingredients which are assigned
-                queryset = queryset.filter(recipe__isnull=False)
-            else:
-                # filter those tags/ingredients which are not assigned
-                queryset = queryset.filter(recipe__isnull=True)
-        except:
-            pass
+        if assigned_only is not None:
+            # filter those tags/ingredients which are (or are not) assigned
+            queryset = filters.filter_assigned(
+                queryset, self.recipe_field, assigned_only
+            )
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+        return queryset.filter(user=self.request.user).order_by("-name", "id")
         # return self.queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         """Creates a new object"""
         serializer.save(user=self.request.user)
 
+    def prepare_bulk_context(self, items):
+        """Load the names of the batch the user already has, in one query"""
+        super().prepare_bulk_context(items)
+        keys = names.name_keys(
+            item["name"].strip()
+            for item in items
+            if isinstance(item, dict) and isinstance(item.get("name"), str)
+        )
+        self.bulk_context["name_keys"] = keys
+        self.bulk_context["taken_names"] = names.taken(
+            self.queryset.model, self.request.user.pk, keys.values()
+        )
+
+    def bulk_written(self, objs, created):
+        """Touch and reindex the recipes of renamed tags/ingredients"""
+        if not created:
+            recipe_ids = self.recipe_ids(objs)
+            signals.touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+            search.update_search_vectors(recipe_ids)
+
+    def bulk_deleting(self, queryset):
+        """Touch the recipes losing a tag/ingredient"""
+        signals.touch_recipes(Recipe.objects.filter(pk__in=self.recipe_ids(queryset)))
+
+    def recipe_ids(self, objs):
+        """Return the ids of the recipes using any of `objs`"""
+        return list(
+            Recipe.objects.filter(**{f"{self.recipe_field}__in": objs})
+            .values_list("pk", flat=True)
+            .distinct()
+        )
+
 
 class TagViewSet(BaseAttrViewSet):
     """Manage tags in the database"""
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_field = "tags"
 
 
 class IngredientViewSet(BaseAttrViewSet):
@@ -52,14 +102,38 @@ class IngredientViewSet(BaseAttrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_field = "ingredients"
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    BulkMixin,
+    ExportMixin,
+    ConditionalGetMixin,
+    CachedListMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
 
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    # set per action, see core.throttling.ScopedThrottle
+    throttle_scope = None
+    # serializer fields reading other columns than their own, if any
+    field_columns = {"tags": (), "ingredients": ()}
+    export_fields = ("title", "time_minutes", "price", "link")
+    export_relations = ("tags", "ingredients")
+
+    def initialize_request(self, request, *args, **kwargs):
+        """Stream image uploads straight to storage with size/format checks"""
+        drf_request = super().initialize_request(request, *args, **kwargs)
+
+        if self.action == "upload_image" and uploads.supports_direct_upload():
+            request.upload_handlers = [uploads.ImageUploadHandler(request)]
+
+        return drf_request
 
     def get_queryset(self):
         """Retrive the queryset for authenticated user"""
@@ -67,17 +141,110 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ingredients = self.request.query_params.get("ingredients")
         queryset = self.queryset
 
+        match = filters.parse_match(self.request.query_params)
+
         if tags:
-            tags_id = list(map(int, tags.split(",")))
-            queryset = queryset.filter(tags__id__in=tags_id)
+            tags_id = filters.parse_ids("tags", tags)
+            queryset = filters.filter_related(queryset, "tags", tags_id, match)
 
         if ingredients:
-            ingredients_id = list(map(int, ingredients.split(",")))
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
+            ingredients_id = filters.parse_ids("ingredients", ingredients)
+            queryset = filters.filter_related(
+                queryset, "ingredients", ingredients_id, match
+            )
+
+        queryset = filters.filter_ranges(queryset, self.request.query_params)
+        queryset = self.prefetch_related(queryset)
+        # the vector is only read by the database
+        queryset = queryset.filter(user=self.request.user).defer("search_vector")
 
-        return queryset.filter(user=self.request.user)
+        if self.search_terms:
+            return search.search_recipes(queryset, self.search_terms)
+
+        return queryset.order_by("-id")
         # return self.queryset.filter(user=self.request.user)
 
+    @property
+    def search_terms(self):
+        """Return the `search` query parameter of list requests"""
+        if self.action != "list":
+            return None
+
+        return self.request.query_params.get("search", "").strip()
+
+    @property
+    def paginator(self):
+        """Page ranked search results by number, everything else by cursor"""
+        if not hasattr(self, "_paginator") and self.search_terms:
+            self._paginator = SearchPagination()
+
+        return super().paginator
+
+    def get_representation(self):
+        """Return the `fields` and `expand` requested for GET responses"""
+        if not hasattr(self, "_representation"):
+            self._representation = self.parse_representation()
+
+        return self._representation
+
+    def parse_representation(self):
+        if self.action not in ("list", "retrieve"):
+            return None, ()
+
+        params = self.request.query_params
+        available = serializers.RecipeSerializer.Meta.fields
+        expandable = serializers.RecipeSerializer.expandable_fields
+        fields = filters.parse_names(params["fields"]) if "fields" in params else None
+        expand = filters.parse_names(params.get("expand", ""))
+
+        for param, values, allowed in (
+            ("fields", fields or (), available),
+            ("expand", expand, expandable),
+        ):
+            unknown = sorted(set(values) - set(allowed))
+
+            if unknown:
+                message = f"Unknown fields: {', '.join(unknown)}"
+                raise ValidationError({param: [message]})
+
+        if self.action == "retrieve":
+            # the detail representation always nests its relations
+            expand = list(expandable)
+
+        return fields, expand
+
+    def prefetch_related(self, queryset):
+        """Load only the columns and relations the requested fields render"""
+        if self.action not in ("list", "retrieve"):
+            return queryset
+
+        fields, expand = self.get_representation()
+        fields = fields or serializers.RecipeSerializer.Meta.fields
+        columns = {"id"}
+
+        for name in fields:
+            columns.update(self.field_columns.get(name, (name,)))
+
+        queryset = queryset.only(*sorted(columns))
+
+        for name, model in (("tags", Tag), ("ingredients", Ingredient)):
+            if name in fields:
+                # nested objects need their names, plain lists only the ids
+                related_columns = ("id", "name") if name in expand else ("id",)
+                related = model.objects.only(*related_columns).order_by("id")
+                queryset = queryset.prefetch_related(Prefetch(name, queryset=related))
+
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        """Pass the requested `fields` and `expand` to GET serializers"""
+        if self.action in ("list", "retrieve"):
+            fields, expand = self.get_representation()
+            kwargs.setdefault("fields", fields)
+            kwargs.setdefault("expand", expand)
+
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         """Return serializer for specific method"""
 
@@ -92,17 +259,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Creates recipe detail object"""
         serializer.save(user=self.request.user)
 
+    def bulk_written(self, objs, created):
+        """Index the titles, tags and ingredients of the written recipes"""
+        search.update_search_vectors([obj.pk for obj in objs])
+
     @action(
-        methods=["GET", "POST", "PUT", "DELETE"], detail=True, url_path="upload-image"
+        methods=["GET", "POST", "PUT", "DELETE"],
+        detail=True,
+        url_path="upload-image",
+        throttle_scope="upload",
     )
     def upload_image(self, request, pk=None):
         """upload an image to a recipe"""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
+        rejected = uploads.get_rejected_upload(request)
+
+        if rejected:
+            # image parts before the rejected one were stored already
+            uploads.discard_stored_files(request)
+
+            return Response(
+                {"image": [rejected.error_message]}, status=rejected.error_status
+            )
 
         if serializer.is_valid():
             serializer.save()
+            uploads.discard_stored_files(request, keep=recipe.image.name)
+
+            if recipe.image:
+                images.schedule_derivatives(recipe.image.name)
 
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+        uploads.discard_stored_files(request)
+
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1,7 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -16,15 +18,27 @@ class CreateTokenView(ObtainAuthToken):
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # ObtainAuthToken turns throttling off
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = "login"
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
 
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        """Retrive and return authenticated user"""
-        return self.request.user
+        """Retrive and return authenticated user
+
+        The authenticated user may come from a cache a few seconds old,
+        updates are made to the current row so they don't write it back.
+        """
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+
+        return generics.get_object_or_404(
+            get_user_model()._default_manager, pk=self.request.user.pk
+        )